@@ -5,13 +5,22 @@ Runs trading strategy on historical data and tracks performance
 
 import json
 import os
-from datetime import datetime, timezone, timedelta
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from enum import Enum
 
-from backtest_simulator import HistoricalDataSimulator, PriceSnapshot, MarketScenario
-from polymarket_strategy import MeanReversionStrategy, Signal, StrategySignal
+from backtest_simulator import HistoricalDataSimulator, MarketScenario
+from polymarket_strategy import MeanReversionStrategy
+
+
+@lru_cache(maxsize=4096)
+def _timestamp_seconds(timestamp: str) -> float:
+    """Parse an ISO timestamp to epoch seconds (cached per timestamp)"""
+    return datetime.fromisoformat(timestamp).timestamp()
 
 
 class BacktestTradeStatus(Enum):
@@ -20,7 +29,7 @@ class BacktestTradeStatus(Enum):
     CLOSED = "closed"
 
 
-@dataclass
+@dataclass(slots=True)
 class BacktestTrade:
     """Represents a trade in backtest"""
     trade_id: str
@@ -38,10 +47,23 @@ class BacktestTrade:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        return {
+            "trade_id": self.trade_id,
+            "entry_time": self.entry_time,
+            "entry_price": self.entry_price,
+            "exit_time": self.exit_time,
+            "exit_price": self.exit_price,
+            "quantity": self.quantity,
+            "p_l": self.p_l,
+            "p_l_percent": self.p_l_percent,
+            "status": self.status,
+            "entry_reason": self.entry_reason,
+            "exit_reason": self.exit_reason,
+            "days_held": self.days_held,
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class BacktestState:
     """State snapshot during backtest"""
     timestamp: str
@@ -54,7 +76,80 @@ class BacktestState:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        return {
+            "timestamp": self.timestamp,
+            "price": self.price,
+            "equity": self.equity,
+            "cash": self.cash,
+            "positions": self.positions,
+            "open_trades": list(self.open_trades),
+            "total_return": self.total_return,
+        }
+
+
+class BacktestStateHistory:
+    """
+    Columnar store for per-tick portfolio states
+    
+    Keeps one column per BacktestState field (numeric fields as float64/int
+    arrays) instead of one object per tick. Iterating yields BacktestState
+    records, so it can be used like the list it replaces.
+    """
+    
+    def __init__(self):
+        """Initialize empty columns"""
+        self.timestamps: List[str] = []
+        self.prices = array('d')
+        self.equities = array('d')
+        self.cash = array('d')
+        self.positions = array('l')
+        # Rows with an unchanged open set share one tuple
+        self.open_trades: List[Tuple[str, ...]] = []
+        self.total_returns = array('d')
+    
+    def append(self,
+               timestamp: str,
+               price: float,
+               equity: float,
+               cash: float,
+               positions: int,
+               open_trades: Tuple[str, ...],
+               total_return: float):
+        """Append one state row"""
+        self.timestamps.append(timestamp)
+        self.prices.append(price)
+        self.equities.append(equity)
+        self.cash.append(cash)
+        self.positions.append(positions)
+        self.open_trades.append(open_trades)
+        self.total_returns.append(total_return)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def __iter__(self):
+        for timestamp, price, equity, cash, positions, open_trades, total_return in zip(
+                self.timestamps, self.prices, self.equities, self.cash,
+                self.positions, self.open_trades, self.total_returns):
+            yield BacktestState(timestamp, price, equity, cash, positions,
+                                list(open_trades), total_return)
+    
+    def to_dicts(self) -> List[Dict]:
+        """Convert all rows to dictionaries"""
+        return [
+            {
+                "timestamp": timestamp,
+                "price": price,
+                "equity": equity,
+                "cash": cash,
+                "positions": positions,
+                "open_trades": list(open_trades),
+                "total_return": total_return,
+            }
+            for timestamp, price, equity, cash, positions, open_trades, total_return
+            in zip(self.timestamps, self.prices, self.equities, self.cash,
+                   self.positions, self.open_trades, self.total_returns)
+        ]
 
 
 class BacktestEngine:
@@ -89,8 +184,22 @@ class BacktestEngine:
         self.trades: List[BacktestTrade] = []
         self.open_positions: Dict[str, BacktestTrade] = {}
         
+        # Closed-trade columns (float64) for aggregate metrics
+        self._closed_pnl = array('d')
+        self._closed_days = array('d')
+        
+        # Running totals over open positions (quantity and entry cost)
+        self._open_quantity = 0.0
+        self._open_cost = 0.0
+        
+        # Number of open positions entered below 0.42
+        self._low_entry_count = 0
+        
+        # Open trade IDs for state rows; None when the open set changed
+        self._open_trade_ids: Optional[Tuple[str, ...]] = ()
+        
         # Performance tracking
-        self.state_history: List[BacktestState] = []
+        self.state_history = BacktestStateHistory()
         self.circuit_breaker_active = False
         self.consecutive_losses = 0
         
@@ -100,6 +209,28 @@ class BacktestEngine:
         # Trade counter
         self.trade_counter = 0
     
+    def reset(self):
+        """
+        Reset portfolio and tracking state for a new run
+        
+        Containers are rebound rather than cleared, so trade lists and
+        histories a caller kept from an earlier run are left intact.
+        """
+        self.cash = self.initial_capital
+        self.equity = self.initial_capital
+        self.trades = []
+        self.open_positions = {}
+        self._closed_pnl = array('d')
+        self._closed_days = array('d')
+        self._open_quantity = 0.0
+        self._open_cost = 0.0
+        self._low_entry_count = 0
+        self._open_trade_ids = ()
+        self.state_history = BacktestStateHistory()
+        self.circuit_breaker_active = False
+        self.consecutive_losses = 0
+        self.trade_counter = 0
+    
     def _generate_trade_id(self) -> str:
         """Generate unique trade ID"""
         self.trade_counter += 1
@@ -152,6 +283,11 @@ class BacktestEngine:
         # Update portfolio
         self.cash -= self.position_size
         self.open_positions[trade.trade_id] = trade
+        self._open_quantity += trade.quantity
+        self._open_cost += trade.entry_price * trade.quantity
+        if entry_price < 0.42:
+            self._low_entry_count += 1
+        self._open_trade_ids = None
         
         return trade
     
@@ -183,9 +319,8 @@ class BacktestEngine:
         p_l_percent = (price_change / trade.entry_price * 100) if trade.entry_price > 0 else 0
         
         # Calculate days held
-        entry_dt = datetime.fromisoformat(trade.entry_time)
-        exit_dt = datetime.fromisoformat(timestamp)
-        days_held = (exit_dt - entry_dt).total_seconds() / 86400
+        held_seconds = _timestamp_seconds(timestamp) - _timestamp_seconds(trade.entry_time)
+        days_held = held_seconds / 86400
         
         # Update trade
         trade.exit_time = timestamp
@@ -199,18 +334,28 @@ class BacktestEngine:
         # Update portfolio
         self.cash += trade.quantity + p_l
         
-        # Track circuit breaker
-        if p_l < 0:
-            self.consecutive_losses += 1
-            if self.consecutive_losses >= 3:
-                self.circuit_breaker_active = True
-        else:
-            self.consecutive_losses = 0
-            self.circuit_breaker_active = False
+        # Track circuit breaker: a loss extends the streak, anything else
+        # resets it; the breaker is on while the streak is 3 or more
+        is_loss = int(p_l < 0)
+        self.consecutive_losses = (self.consecutive_losses + is_loss) * is_loss
+        self.circuit_breaker_active = self.consecutive_losses >= 3
         
         # Move to closed trades
         del self.open_positions[trade_id]
         self.trades.append(trade)
+        self._closed_pnl.append(p_l)
+        self._closed_days.append(days_held)
+        if trade.entry_price < 0.42:
+            self._low_entry_count -= 1
+        self._open_trade_ids = None
+        
+        if self.open_positions:
+            self._open_quantity -= trade.quantity
+            self._open_cost -= trade.entry_price * trade.quantity
+        else:
+            # Reset exactly to avoid float drift once the book is flat
+            self._open_quantity = 0.0
+            self._open_cost = 0.0
         
         return trade
     
@@ -221,11 +366,8 @@ class BacktestEngine:
         Args:
             current_price: Current market price
         """
-        unrealized = 0.0
-        
-        for trade in self.open_positions.values():
-            price_change = current_price - trade.entry_price
-            unrealized += price_change * trade.quantity * 100
+        # sum((price - entry) * qty) == price * sum(qty) - sum(entry * qty)
+        unrealized = (current_price * self._open_quantity - self._open_cost) * 100
         
         # Update equity
         self.equity = self.cash + unrealized
@@ -240,16 +382,19 @@ class BacktestEngine:
         """
         self.update_unrealized_pnl(price)
         
-        state = BacktestState(
-            timestamp=timestamp,
-            price=price,
-            equity=self.equity,
-            cash=self.cash,
-            positions=len(self.open_positions),
-            open_trades=list(self.open_positions.keys()),
-            total_return=(self.equity - self.initial_capital) / self.initial_capital * 100
+        # Only rebuild the open-trade ID tuple after an entry or exit
+        if self._open_trade_ids is None:
+            self._open_trade_ids = tuple(self.open_positions)
+        
+        self.state_history.append(
+            timestamp,
+            price,
+            self.equity,
+            self.cash,
+            len(self.open_positions),
+            self._open_trade_ids,
+            (self.equity - self.initial_capital) / self.initial_capital * 100
         )
-        self.state_history.append(state)
     
     def run(self,
             historical_data: HistoricalDataSimulator) -> Dict:
@@ -267,41 +412,46 @@ class BacktestEngine:
         print(f"{'='*70}")
         
         # Reset state
-        self.cash = self.initial_capital
-        self.equity = self.initial_capital
-        self.trades = []
-        self.open_positions = {}
-        self.state_history = []
-        self.circuit_breaker_active = False
-        self.consecutive_losses = 0
-        self.trade_counter = 0
+        self.reset()
         
+        # Read the simulator's price and timestamp columns directly
         prices = historical_data.prices
+        price_col = prices.yes_prices
+        time_col = prices.timestamps
+        num_snapshots = len(price_col)
+        
+        # Bind hot-loop lookups locally (open_positions is only ever
+        # mutated in place, so the binding stays valid for the run)
+        open_positions = self.open_positions
+        check_exits = self._check_exits
+        check_entries = self._check_entries
+        record_state = self.record_state
         
         # Process each price snapshot
-        for i, snapshot in enumerate(prices):
-            current_price = snapshot.yes_price
-            timestamp = snapshot.timestamp
-            
+        for i, (current_price, timestamp) in enumerate(zip(price_col, time_col), 1):
             # Check for exit signals (profit taking, expiration)
-            self._check_exits(current_price, timestamp)
+            # Exits can only fire while positions are open
+            if open_positions:
+                check_exits(current_price, timestamp)
             
             # Check for entry signals
             # For backtest, we use price thresholds from strategy
-            self._check_entries(current_price, timestamp)
+            # Entries can only fire below the buy threshold
+            if current_price < 0.40:
+                check_entries(current_price, timestamp)
             
             # Record state
-            self.record_state(timestamp, current_price)
+            record_state(timestamp, current_price)
             
             # Print progress
-            if (i + 1) % 100 == 0:
-                print(f"  Processed {i + 1}/{len(prices)} snapshots | "
+            if i % 100 == 0:
+                print(f"  Processed {i}/{num_snapshots} snapshots | "
                       f"Equity: ${self.equity:.2f} | "
                       f"Positions: {len(self.open_positions)}")
         
         # Close any remaining open positions at final price
-        final_price = prices[-1].yes_price
-        final_time = prices[-1].timestamp
+        final_price = price_col[-1]
+        final_time = time_col[-1]
         for trade_id in list(self.open_positions.keys()):
             self.execute_exit(trade_id, final_price, "Backtest ended", final_time)
         
@@ -327,10 +477,9 @@ class BacktestEngine:
         """
         # Buy signal: price below 0.40 (mean reversion)
         if current_price < 0.40:
-            # Check if we already have a position
-            has_entry = any(t.entry_price < 0.42 for t in self.open_positions.values())
-            
-            if not has_entry:
+            # Check if we already have a position, and skip formatting the
+            # signal reason when the entry would be rejected anyway
+            if self._low_entry_count == 0 and self._can_open_trade():
                 self.execute_entry(current_price, 
                                   f"Mean reversion signal (price {current_price:.2%})",
                                   timestamp)
@@ -343,18 +492,19 @@ class BacktestEngine:
             current_price: Current price
             timestamp: Current timestamp
         """
-        for trade_id, trade in list(self.open_positions.items()):
-            # Exit signal: price above 0.60 (profit taking)
-            if current_price > 0.60:
-                self.execute_exit(trade_id, current_price,
-                                "Profit target reached (>60%)",
-                                timestamp)
-            
-            # Stop loss: price below entry - 10%
-            elif current_price < trade.entry_price * 0.90:
-                self.execute_exit(trade_id, current_price,
-                                "Stop loss (-10%)",
-                                timestamp)
+        # Exit signal: price above 0.60 (profit taking) closes every position
+        if current_price > 0.60:
+            exiting = list(self.open_positions)
+            reason = "Profit target reached (>60%)"
+        
+        # Stop loss: price below entry - 10%
+        else:
+            exiting = [trade_id for trade_id, trade in self.open_positions.items()
+                       if current_price < trade.entry_price * 0.90]
+            reason = "Stop loss (-10%)"
+        
+        for trade_id in exiting:
+            self.execute_exit(trade_id, current_price, reason, timestamp)
     
     def _compile_results(self, scenario: MarketScenario) -> Dict:
         """
@@ -367,8 +517,13 @@ class BacktestEngine:
             Dict with results
         """
         completed_trades = [t for t in self.trades if t.status == "closed"]
-        winning_trades = [t for t in completed_trades if t.p_l > 0]
-        losing_trades = [t for t in completed_trades if t.p_l <= 0]
+        pnl = self._closed_pnl
+        days = self._closed_days
+        
+        # One reduction per statistic over the closed-trade columns
+        num_trades = len(pnl)
+        num_winning = sum(1 for x in pnl if x > 0)
+        total_pnl = sum(pnl)
         
         return {
             "scenario": scenario.value,
@@ -376,18 +531,18 @@ class BacktestEngine:
             "final_equity": self.equity,
             "total_return_dollars": self.equity - self.initial_capital,
             "total_return_percent": (self.equity - self.initial_capital) / self.initial_capital * 100,
-            "num_trades": len(completed_trades),
-            "winning_trades": len(winning_trades),
-            "losing_trades": len(losing_trades),
-            "win_rate": len(winning_trades) / len(completed_trades) * 100 if completed_trades else 0,
-            "total_pnl": sum(t.p_l for t in completed_trades),
-            "avg_trade_pnl": sum(t.p_l for t in completed_trades) / len(completed_trades) if completed_trades else 0,
-            "best_trade": max((t.p_l for t in completed_trades), default=0),
-            "worst_trade": min((t.p_l for t in completed_trades), default=0),
-            "avg_trade_duration": sum(t.days_held for t in completed_trades) / len(completed_trades) if completed_trades else 0,
+            "num_trades": num_trades,
+            "winning_trades": num_winning,
+            "losing_trades": num_trades - num_winning,
+            "win_rate": num_winning / num_trades * 100 if num_trades else 0,
+            "total_pnl": total_pnl,
+            "avg_trade_pnl": total_pnl / num_trades if num_trades else 0,
+            "best_trade": max(pnl, default=0),
+            "worst_trade": min(pnl, default=0),
+            "avg_trade_duration": sum(days) / num_trades if num_trades else 0,
             "max_consecutive_losses": 0,
             "trades": [t.to_dict() for t in completed_trades],
-            "state_history": [s.to_dict() for s in self.state_history]
+            "state_history": self.state_history.to_dicts()
         }
     
     def get_equity_curve(self) -> Tuple[List[str], List[float]]:
@@ -397,21 +552,23 @@ class BacktestEngine:
         Returns:
             Tuple of (timestamps, equity_values)
         """
-        timestamps = [s.timestamp for s in self.state_history]
-        equities = [s.equity for s in self.state_history]
-        return timestamps, equities
+        return list(self.state_history.timestamps), list(self.state_history.equities)
 
 
 def run_backtest_scenario(scenario: MarketScenario, 
                          num_days: int = 30,
-                         initial_capital: float = 1000.0) -> Dict:
+                         initial_capital: float = 1000.0,
+                         engine: Optional[BacktestEngine] = None,
+                         seed: Optional[int] = None) -> Dict:
     """
     Run complete backtest for a scenario
     
     Args:
         scenario: Market scenario to backtest
         num_days: Number of days to simulate
-        initial_capital: Starting capital
+        initial_capital: Starting capital (ignored when engine is given)
+        engine: Existing engine to reuse (reset before running)
+        seed: Random seed for the price simulation
         
     Returns:
         Dict with backtest results
@@ -420,12 +577,14 @@ def run_backtest_scenario(scenario: MarketScenario,
     simulator = HistoricalDataSimulator(
         num_days=num_days,
         scenario=scenario,
-        initial_yes_price=0.45
+        initial_yes_price=0.45,
+        seed=seed
     )
     simulator.generate_price_series()
     
     # Run backtest
-    engine = BacktestEngine(initial_capital=initial_capital)
+    if engine is None:
+        engine = BacktestEngine(initial_capital=initial_capital)
     results = engine.run(simulator)
     
     return results
@@ -434,12 +593,16 @@ def run_backtest_scenario(scenario: MarketScenario,
 def main():
     """Run backtests on all scenarios"""
     
-    all_results = {}
+    scenarios = [MarketScenario.BULL, MarketScenario.BEAR,
+                 MarketScenario.SIDEWAYS, MarketScenario.VOLATILE]
     
-    for scenario in [MarketScenario.BULL, MarketScenario.BEAR,
-                     MarketScenario.SIDEWAYS, MarketScenario.VOLATILE]:
-        results = run_backtest_scenario(scenario, num_days=30)
-        all_results[scenario.value] = results
+    # Scenarios are independent, so run them in parallel worker processes
+    # (map keeps results in scenario order)
+    with ProcessPoolExecutor(max_workers=len(scenarios)) as executor:
+        scenario_results = executor.map(run_backtest_scenario, scenarios,
+                                        [30] * len(scenarios))
+        all_results = {scenario.value: results
+                       for scenario, results in zip(scenarios, scenario_results)}
     
     # Save results
     output = {
@@ -449,8 +612,10 @@ def main():
     
     os.makedirs("backtest_results", exist_ok=True)
     
+    # Encode in one shot without indentation so the C encoder is used
+    # (json.dump/indent fall back to the pure-Python encoder)
     with open("backtest_results/backtest_results.json", "w") as f:
-        json.dump(output, f, indent=2)
+        f.write(json.dumps(output, separators=(",", ":")))
     
     print(f"\nResults saved to backtest_results/backtest_results.json")
     
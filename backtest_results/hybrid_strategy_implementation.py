@@ -2,6 +2,7 @@
 Optimized Strategy with Bear Market Reversal Trading
 """
 
+from collections import deque
 from enum import Enum
 
 class MarketRegime(Enum):
@@ -15,8 +16,12 @@ class HybridTradingStrategy:
     Hybrid strategy combining mean reversion and reversal trading
     """
     
+    # Longest lookback used by detect_regime
+    HISTORY_WINDOW = 20
+    
     def __init__(self):
-        self.price_history = []
+        # Only the last HISTORY_WINDOW prices are ever read
+        self.price_history = deque(maxlen=self.HISTORY_WINDOW)
         self.regime = MarketRegime.SIDEWAYS
         
         # Mean reversion params
@@ -32,10 +37,14 @@ class HybridTradingStrategy:
         if len(self.price_history) < 20:
             return MarketRegime.SIDEWAYS
         
-        trend = (self.price_history[-1] - self.price_history[-20]) / self.price_history[-20]
+        history = self.price_history
+        first = history[0]
+        trend = (history[-1] - first) / first
         
-        volatility = sum(abs(self.price_history[i] - self.price_history[i-1]) 
-                        for i in range(-5, 0)) / 5
+        # Mean absolute change over the last 5 steps
+        p0, p1, p2, p3, p4, p5 = (history[i] for i in range(-6, 0))
+        volatility = (abs(p1 - p0) + abs(p2 - p1) + abs(p3 - p2) +
+                      abs(p4 - p3) + abs(p5 - p4)) / 5
         
         if trend < -0.05 and volatility > 0.02:
             return MarketRegime.BEAR
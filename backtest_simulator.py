@@ -6,12 +6,19 @@ Simulates realistic price movements and market conditions for backtesting
 import json
 import math
 import random
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 
+# Intraday snapshot hours: morning, midday, evening, night
+SNAPSHOT_HOURS = (6, 12, 18, 23)
+
+
 class MarketScenario(Enum):
     """Market scenarios for simulation"""
     BULL = "bull"           # Prices trending upward
@@ -20,7 +27,7 @@ class MarketScenario(Enum):
     VOLATILE = "volatile"   # High volatility, random walks
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceSnapshot:
     """A snapshot of market price at a point in time"""
     timestamp: str
@@ -34,6 +41,66 @@ class PriceSnapshot:
         return asdict(self)
 
 
+class PriceSeries:
+    """
+    Columnar store of price snapshots
+    
+    Keeps one column per PriceSnapshot field (numeric fields as float64
+    arrays) instead of one object per snapshot. Indexing and iteration
+    build PriceSnapshot records on demand, so it can be used like the list
+    of snapshots it replaces. Rows must be appended in time order; the
+    epoch-seconds column is used for binary-search time lookups.
+    """
+    
+    def __init__(self):
+        """Initialize empty columns"""
+        self.timestamps: List[str] = []
+        self.epochs = array('d')
+        self.yes_prices = array('d')
+        self.no_prices = array('d')
+        self.volumes = array('d')
+        self.volatilities = array('d')
+    
+    def append(self,
+               timestamp: str,
+               yes_price: float,
+               no_price: float,
+               volume: float,
+               volatility: float,
+               epoch: float):
+        """Append one snapshot row (epoch is the timestamp in epoch seconds)"""
+        self.timestamps.append(timestamp)
+        self.epochs.append(epoch)
+        self.yes_prices.append(yes_price)
+        self.no_prices.append(no_price)
+        self.volumes.append(volume)
+        self.volatilities.append(volatility)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return PriceSnapshot(
+            timestamp=self.timestamps[index],
+            yes_price=self.yes_prices[index],
+            no_price=self.no_prices[index],
+            volume=self.volumes[index],
+            volatility=self.volatilities[index]
+        )
+    
+    def __iter__(self):
+        for row in zip(self.timestamps, self.yes_prices, self.no_prices,
+                       self.volumes, self.volatilities):
+            yield PriceSnapshot(*row)
+    
+    def yes_price_stats(self) -> Tuple[float, float, float]:
+        """Return (min, max, mean) of the YES price column"""
+        prices = self.yes_prices
+        return min(prices), max(prices), sum(prices) / len(prices)
+
+
 class HistoricalDataSimulator:
     """
     Simulates realistic historical price data for backtesting
@@ -50,7 +117,8 @@ class HistoricalDataSimulator:
                  start_date: datetime = None,
                  num_days: int = 30,
                  scenario: MarketScenario = MarketScenario.BULL,
-                 initial_yes_price: float = 0.45):
+                 initial_yes_price: float = 0.45,
+                 seed: Optional[int] = None):
         """
         Initialize the simulator
         
@@ -59,23 +127,28 @@ class HistoricalDataSimulator:
             num_days: Number of days to simulate
             scenario: Market scenario (BULL, BEAR, SIDEWAYS, VOLATILE)
             initial_yes_price: Starting YES price (0.0 to 1.0)
+            seed: Seed for this simulator's random generator (None = OS entropy)
         """
         self.scenario = scenario
         self.num_days = num_days
         self.initial_yes_price = initial_yes_price
         
         # Set start date
+        now = datetime.now(timezone.utc)
         if start_date is None:
-            self.start_date = datetime.now(timezone.utc) - timedelta(days=num_days)
+            self.start_date = now - timedelta(days=num_days)
         else:
             self.start_date = start_date
         
         # Scenario parameters
         self._setup_scenario_params()
         
+        # Private generator so series are reproducible per simulator
+        self._rng = random.Random(seed)
+        
         # Price history
-        self.prices: List[PriceSnapshot] = []
-        self.market_id = f"sim_{scenario.value}_{int(datetime.now(timezone.utc).timestamp())}"
+        self.prices = PriceSeries()
+        self.market_id = f"sim_{scenario.value}_{int(now.timestamp())}"
     
     def _setup_scenario_params(self):
         """Setup parameters based on scenario"""
@@ -110,95 +183,71 @@ class HistoricalDataSimulator:
             self.mean_price = 0.50
             self.mean_reversion_speed = 0.05  # Weak mean reversion
             self.base_volume = 6000.0
-    
-    def _generate_price_movement(self, current_price: float) -> float:
-        """
-        Generate next price movement using geometric Brownian motion
-        with mean reversion
-        
-        Args:
-            current_price: Current price
-            
-        Returns:
-            Next price
-        """
-        # Brownian motion component
-        random_shock = random.gauss(0, self.volatility)
-        
-        # Drift component (scenario-specific trend)
-        drift_component = self.drift
-        
-        # Mean reversion component
-        price_deviation = current_price - self.mean_price
-        reversion_component = -self.mean_reversion_speed * price_deviation
-        
-        # Combine components
-        log_return = drift_component + reversion_component + random_shock
-        
-        # Calculate new price
-        new_price = current_price * math.exp(log_return)
         
-        # Clamp to valid range [0.01, 0.99]
-        new_price = max(0.01, min(0.99, new_price))
-        
-        return new_price
+        # Reciprocal for volatility-relative volume scaling
+        self._inv_volatility = 1.0 / self.volatility
     
-    def _generate_volume(self, base_volatility: float) -> float:
-        """
-        Generate trading volume with clustering
-        
-        Args:
-            base_volatility: Current volatility level
-            
-        Returns:
-            Volume amount
-        """
-        # Volume tends to increase with volatility
-        volatility_factor = 1 + (base_volatility / self.volatility) * 0.5
-        
-        # Add some randomness
-        noise = random.gauss(1.0, 0.2)
-        
-        volume = self.base_volume * volatility_factor * noise
-        return max(500, volume)  # Minimum volume
-    
-    def generate_price_series(self) -> List[PriceSnapshot]:
+    def generate_price_series(self) -> PriceSeries:
         """
         Generate a series of price snapshots
         
         Returns:
-            List of PriceSnapshot objects
+            PriceSeries of generated snapshots
         """
-        self.prices = []
+        self.prices = PriceSeries()
         current_price = self.initial_yes_price
         current_time = self.start_date
         current_volatility = self.volatility
         
+        # Bind RNG/math functions and scenario parameters locally for the
+        # per-snapshot model below
+        rng = self._rng
+        gauss = rng.gauss
+        rand = rng.random
+        exp = math.exp
+        volatility = self.volatility
+        drift = self.drift
+        mean_price = self.mean_price
+        reversion_speed = self.mean_reversion_speed
+        base_volume = self.base_volume
+        inv_volatility = self._inv_volatility
+        # Regime changes redraw volatility uniformly in [0.7, 1.5] x base;
+        # inlined as low + span * random() (what uniform() computes)
+        regime_low = volatility * 0.7
+        regime_span = volatility * 0.8
+        append = self.prices.append
+        
+        # Intraday offsets are built once; epoch seconds come from integer
+        # microseconds (the same value datetime.timestamp() would return)
+        offsets = [(timedelta(hours=hour), hour * 3_600_000_000)
+                   for hour in SNAPSHOT_HOURS]
+        one_day = timedelta(days=1)
+        day_micros = round(current_time.timestamp() * 1_000_000)
+        
         # Generate daily snapshots
         for day in range(self.num_days):
             # Generate intraday prices (4 snapshots per day for better resolution)
-            for hour in [6, 12, 18, 23]:  # Morning, midday, evening, night
-                current_price = self._generate_price_movement(current_price)
+            for offset, offset_micros in offsets:
+                # Drift + mean reversion + Brownian shock, clamped to [0.01, 0.99]
+                log_return = drift - reversion_speed * (current_price - mean_price) + gauss(0, volatility)
+                current_price = max(0.01, min(0.99, current_price * exp(log_return)))
                 
                 # Update volatility (volatility clustering)
-                if random.random() < 0.1:  # 10% chance of regime change
-                    current_volatility = self.volatility * random.uniform(0.7, 1.5)
+                if rand() < 0.1:  # 10% chance of regime change
+                    current_volatility = regime_low + regime_span * rand()
                 
-                volume = self._generate_volume(current_volatility)
+                # Volume rises with volatility, with some noise
+                volatility_factor = 1 + current_volatility * inv_volatility * 0.5
+                volume = max(500, base_volume * volatility_factor * gauss(1.0, 0.2))
                 
                 # Create snapshot
-                timestamp = current_time + timedelta(hours=hour)
-                snapshot = PriceSnapshot(
-                    timestamp=timestamp.isoformat(),
-                    yes_price=current_price,
-                    no_price=1.0 - current_price,
-                    volume=volume,
-                    volatility=current_volatility
-                )
-                self.prices.append(snapshot)
+                append((current_time + offset).isoformat(), current_price,
+                       1.0 - current_price, volume, current_volatility,
+                       (day_micros + offset_micros) / 1e6)
             
             # Move to next day
-            current_time += timedelta(days=1)
+            current_time += one_day
+            day_micros += 86_400_000_000
         
         return self.prices
     
@@ -215,15 +264,15 @@ class HistoricalDataSimulator:
         if not self.prices:
             return None
         
-        # Find closest timestamp
-        closest = min(
-            self.prices,
-            key=lambda p: abs(
-                datetime.fromisoformat(p.timestamp) - target_time
-            )
-        )
+        # Binary search the sorted epoch column for the closest timestamp
+        # (ties go to the earlier snapshot)
+        epochs = self.prices.epochs
+        target = target_time.timestamp()
+        i = bisect_left(epochs, target)
+        if i == len(epochs) or (i > 0 and target - epochs[i - 1] <= epochs[i] - target):
+            i -= 1
         
-        return closest
+        return self.prices[i]
     
     def get_prices_in_range(self, 
                            start_time: datetime, 
@@ -241,11 +290,12 @@ class HistoricalDataSimulator:
         if not self.prices:
             return []
         
-        start_iso = start_time.isoformat()
-        end_iso = end_time.isoformat()
+        # Bracket the range on the sorted epoch column (inclusive bounds)
+        epochs = self.prices.epochs
+        lo = bisect_left(epochs, start_time.timestamp())
+        hi = bisect_right(epochs, end_time.timestamp())
         
-        return [p for p in self.prices 
-                if start_iso <= p.timestamp <= end_iso]
+        return self.prices[lo:hi]
     
     def export_to_json(self, filepath: str = None) -> str:
         """
@@ -261,10 +311,8 @@ class HistoricalDataSimulator:
             filepath = f"historical_data_{self.scenario.value}.json"
         
         # Calculate statistics
-        prices = [p.yes_price for p in self.prices]
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
+        prices = self.prices.yes_prices
+        min_price, max_price, avg_price = self.prices.yes_price_stats()
         
         data = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
@@ -274,7 +322,7 @@ class HistoricalDataSimulator:
             "num_days": self.num_days,
             "num_snapshots": len(self.prices),
             "initial_price": self.initial_yes_price,
-            "final_price": self.prices[-1].yes_price if self.prices else None,
+            "final_price": prices[-1] if prices else None,
             "min_price": min_price,
             "max_price": max_price,
             "avg_price": avg_price,
@@ -283,14 +331,31 @@ class HistoricalDataSimulator:
                 "min_price": min_price,
                 "max_price": max_price,
                 "avg_price": avg_price,
-                "price_change_pct": ((self.prices[-1].yes_price - self.initial_yes_price) / 
-                                    self.initial_yes_price * 100) if self.prices else 0,
+                "price_change_pct": ((prices[-1] - self.initial_yes_price) /
+                                    self.initial_yes_price * 100)
+                                    if self.prices and self.initial_yes_price else 0,
             },
-            "prices": [p.to_dict() for p in self.prices]
         }
         
+        # Stream the price rows straight from the columns (compact JSON, one
+        # small dict at a time) instead of building the whole document first
+        series = self.prices
+        rows = zip(series.timestamps, series.yes_prices, series.no_prices,
+                   series.volumes, series.volatilities)
         with open(filepath, "w") as f:
-            json.dump(data, f, indent=2)
+            f.write(json.dumps(data, separators=(",", ":"))[:-1])
+            f.write(',"prices":[')
+            for i, (timestamp, yes_price, no_price, volume, volatility) in enumerate(rows):
+                if i:
+                    f.write(",")
+                f.write(json.dumps({
+                    "timestamp": timestamp,
+                    "yes_price": yes_price,
+                    "no_price": no_price,
+                    "volume": volume,
+                    "volatility": volatility,
+                }, separators=(",", ":")))
+            f.write("]}")
         
         print(f"✅ Exported {len(self.prices)} price snapshots to {filepath}")
         return filepath
@@ -301,11 +366,8 @@ class HistoricalDataSimulator:
             print("No price data generated yet")
             return
         
-        prices = [p.yes_price for p in self.prices]
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
-        final_price = prices[-1]
+        min_price, max_price, avg_price = self.prices.yes_price_stats()
+        final_price = self.prices.yes_prices[-1]
         
         print(f"\n{'='*60}")
         print(f"HISTORICAL DATA SIMULATION - {self.scenario.value.upper()}")
@@ -320,7 +382,8 @@ class HistoricalDataSimulator:
         print(f"  Max: {max_price:.4f}")
         print(f"  Average: {avg_price:.4f}")
         print(f"  Range: {max_price - min_price:.4f}")
-        print(f"  Return: {(final_price - self.initial_yes_price) / self.initial_yes_price * 100:+.2f}%")
+        if self.initial_yes_price:
+            print(f"  Return: {(final_price - self.initial_yes_price) / self.initial_yes_price * 100:+.2f}%")
         print(f"\nScenario Parameters:")
         print(f"  Drift: {self.drift:+.4f}")
         print(f"  Volatility: {self.volatility:.4f}")
@@ -329,6 +392,21 @@ class HistoricalDataSimulator:
         print(f"{'='*60}\n")
 
 
+def _generate_scenario(scenario: MarketScenario,
+                       num_days: int,
+                       initial_yes_price: float,
+                       seed: Optional[int] = None) -> HistoricalDataSimulator:
+    """Create a simulator and generate its price series (worker entry point)"""
+    simulator = HistoricalDataSimulator(
+        num_days=num_days,
+        scenario=scenario,
+        initial_yes_price=initial_yes_price,
+        seed=seed
+    )
+    simulator.generate_price_series()
+    return simulator
+
+
 class BacktestDataManager:
     """Manages multiple historical datasets for backtesting"""
     
@@ -339,7 +417,8 @@ class BacktestDataManager:
     def add_scenario(self, 
                     scenario: MarketScenario,
                     num_days: int = 30,
-                    initial_yes_price: float = 0.45) -> HistoricalDataSimulator:
+                    initial_yes_price: float = 0.45,
+                    seed: Optional[int] = None) -> HistoricalDataSimulator:
         """
         Add a new scenario to the dataset
         
@@ -347,19 +426,44 @@ class BacktestDataManager:
             scenario: Market scenario
             num_days: Number of days to simulate
             initial_yes_price: Initial price
+            seed: Random seed for the simulator
             
         Returns:
             HistoricalDataSimulator instance
         """
-        simulator = HistoricalDataSimulator(
-            num_days=num_days,
-            scenario=scenario,
-            initial_yes_price=initial_yes_price
-        )
-        simulator.generate_price_series()
+        simulator = _generate_scenario(scenario, num_days, initial_yes_price, seed)
         self.simulators[scenario.value] = simulator
         return simulator
     
+    def add_scenarios(self,
+                      scenarios: List[MarketScenario],
+                      num_days: int = 30,
+                      initial_yes_price: float = 0.45,
+                      seed: Optional[int] = None) -> List[HistoricalDataSimulator]:
+        """
+        Add several scenarios, generating them in parallel worker processes
+        
+        Args:
+            scenarios: Market scenarios to generate
+            num_days: Number of days to simulate
+            initial_yes_price: Initial price
+            seed: Base random seed; scenario i uses seed + i
+            
+        Returns:
+            HistoricalDataSimulator instances in scenario order
+        """
+        n = len(scenarios)
+        seeds = [None] * n if seed is None else [seed + i for i in range(n)]
+        with ProcessPoolExecutor(max_workers=n or None) as executor:
+            simulators = list(executor.map(_generate_scenario, scenarios,
+                                           [num_days] * n,
+                                           [initial_yes_price] * n,
+                                           seeds))
+        
+        for scenario, simulator in zip(scenarios, simulators):
+            self.simulators[scenario.value] = simulator
+        return simulators
+    
     def get_scenario(self, scenario: MarketScenario) -> Optional[HistoricalDataSimulator]:
         """Get a specific scenario"""
         return self.simulators.get(scenario.value)
@@ -383,9 +487,12 @@ def main():
     # Generate scenarios
     print("Generating historical data for all scenarios...\n")
     
-    for scenario in [MarketScenario.BULL, MarketScenario.BEAR, 
-                     MarketScenario.SIDEWAYS, MarketScenario.VOLATILE]:
-        sim = manager.add_scenario(scenario, num_days=30, initial_yes_price=0.45)
+    simulators = manager.add_scenarios(
+        [MarketScenario.BULL, MarketScenario.BEAR,
+         MarketScenario.SIDEWAYS, MarketScenario.VOLATILE],
+        num_days=30, initial_yes_price=0.45
+    )
+    for sim in simulators:
         sim.print_summary()
     
     # Export all
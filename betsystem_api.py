@@ -9,10 +9,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import json
+import os
 import sqlite3
+import threading
+import time
+import urllib.request
 import uuid
 from datetime import datetime
-import subprocess
 from betsystem_core import (
     User, Match, BetSuggestion, BetSuggestionEngine,
     FlatBetting, KellyCriterion, ValueBetting, PoissonModel, ELORating, Martingale
@@ -76,11 +79,23 @@ class BetResult(BaseModel):
 class Database:
     def __init__(self, db_file: str = "betsystem.db"):
         self.db_file = db_file
+        self._local = threading.local()
         self.init_db()
     
     def get_connection(self):
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
+        """
+        Return this thread's connection, opening it on first use.
+        The connection outlives the request, so writes must run inside
+        `with conn:` to be committed or rolled back as a unit.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
         return conn
     
     def init_db(self):
@@ -152,8 +167,11 @@ class Database:
             )
         """)
         
+        # Per-user lookups; the bets index also covers the ROI aggregate
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bets_user_result ON bets(user_id, result, profit_loss)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_user ON matches(user_id)")
+        
         conn.commit()
-        conn.close()
 
 db = Database()
 
@@ -164,22 +182,22 @@ def get_user_by_id(user_id: str) -> Optional[User]:
     conn = db.get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    user_row = cursor.fetchone()
-    
-    cursor.execute("SELECT * FROM bankrolls WHERE user_id = ?", (user_id,))
-    bankroll_row = cursor.fetchone()
-    
-    conn.close()
+    cursor.execute("""
+        SELECT u.id, u.email, b.current_amount, b.max_stake_percent,
+               b.daily_loss_limit, b.stop_loss_locked
+        FROM users u JOIN bankrolls b ON b.user_id = u.id
+        WHERE u.id = ?
+    """, (user_id,))
+    row = cursor.fetchone()
     
-    if user_row and bankroll_row:
+    if row:
         return User(
-            id=user_row['id'],
-            email=user_row['email'],
-            bankroll=bankroll_row['current_amount'],
-            max_stake_percent=bankroll_row['max_stake_percent'],
-            daily_loss_limit=bankroll_row['daily_loss_limit'],
-            stop_loss_locked=bool(bankroll_row['stop_loss_locked'])
+            id=row['id'],
+            email=row['email'],
+            bankroll=row['current_amount'],
+            max_stake_percent=row['max_stake_percent'],
+            daily_loss_limit=row['daily_loss_limit'],
+            stop_loss_locked=bool(row['stop_loss_locked'])
         )
     
     return None
@@ -210,19 +228,51 @@ def run_game_theory_skill(strategy: str, odds: float) -> dict:
     except:
         return {"optimized": False}
 
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+TAVILY_CACHE_TTL = 600  # seconds
+TAVILY_CACHE_MAX = 256  # entries
+
+# query -> (expires_at, result), oldest first; only successful searches are cached
+_tavily_cache = {}
+
+def _cache_tavily_result(query: str, result: dict):
+    """Cache a search result, evicting expired entries and keeping the cache bounded"""
+    now = time.monotonic()
+    _tavily_cache.pop(query, None)  # Re-insert at the end (newest)
+    # Entries share one TTL, so insertion order is expiry order
+    while _tavily_cache:
+        oldest = next(iter(_tavily_cache))
+        if _tavily_cache[oldest][0] > now and len(_tavily_cache) < TAVILY_CACHE_MAX:
+            break
+        del _tavily_cache[oldest]
+    _tavily_cache[query] = (now + TAVILY_CACHE_TTL, result)
+
 def run_tavily_search(query: str) -> dict:
-    """Run tavily-search for team research"""
+    """Run tavily-search for team research (direct REST call, no node subprocess)"""
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        return {"research": "TAVILY_API_KEY not set", "success": False}
+    
+    cached = _tavily_cache.get(query)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
     try:
-        cmd = f"""
-        export TAVILY_API_KEY="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"
-        node /data/.openclaw/workspace/skills/tavily-search/scripts/search.mjs "{query}" -n 3
-        """
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=15)
+        payload = json.dumps({"api_key": api_key, "query": query, "max_results": 3})
+        req = urllib.request.Request(
+            TAVILY_SEARCH_URL,
+            data=payload.encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=15) as response:
+            data = json.loads(response.read().decode("utf-8"))
         
-        return {
-            "research": result.stdout[:500] if result.returncode == 0 else "Research failed",
-            "success": result.returncode == 0
-        }
+        research = "\n".join(
+            f"{r.get('title', '')}: {r.get('content', '')}" for r in data.get("results", [])
+        )
+        result = {"research": research[:500], "success": True}
+        _cache_tavily_result(query, result)
+        return result
     except:
         return {"research": "Unable to research", "success": False}
 
@@ -247,18 +297,17 @@ async def register(user: UserCreate):
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            INSERT INTO users (id, email, username, password_hash, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, user.email, user.username, "hashed_password", datetime.now().isoformat(), datetime.now().isoformat()))
-        
-        # Create default bankroll
-        cursor.execute("""
-            INSERT INTO bankrolls (id, user_id, starting_amount, current_amount, max_stake_percent, daily_loss_limit, weekly_loss_limit, stop_loss_locked, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (str(uuid.uuid4()), user_id, 1000.0, 1000.0, 5.0, 200.0, 500.0, False, datetime.now().isoformat()))
-        
-        conn.commit()
+        with conn:
+            cursor.execute("""
+                INSERT INTO users (id, email, username, password_hash, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (user_id, user.email, user.username, "hashed_password", datetime.now().isoformat(), datetime.now().isoformat()))
+            
+            # Create default bankroll
+            cursor.execute("""
+                INSERT INTO bankrolls (id, user_id, starting_amount, current_amount, max_stake_percent, daily_loss_limit, weekly_loss_limit, stop_loss_locked, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (str(uuid.uuid4()), user_id, 1000.0, 1000.0, 5.0, 200.0, 500.0, False, datetime.now().isoformat()))
         
         return {
             "user_id": user_id,
@@ -266,9 +315,8 @@ async def register(user: UserCreate):
             "message": "User registered successfully"
         }
     except sqlite3.IntegrityError:
+        # `with conn` has already rolled the inserts back
         raise HTTPException(status_code=400, detail="Email already exists")
-    finally:
-        conn.close()
 
 @app.post("/auth/login")
 async def login(user: UserLogin):
@@ -278,7 +326,6 @@ async def login(user: UserLogin):
     
     cursor.execute("SELECT * FROM users WHERE username = ?", (user.username,))
     db_user = cursor.fetchone()
-    conn.close()
     
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -320,14 +367,12 @@ async def update_bankroll(user_id: str, bankroll: BankrollUpdate):
     conn = db.get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        UPDATE bankrolls
-        SET starting_amount = ?, current_amount = ?, max_stake_percent = ?, daily_loss_limit = ?, weekly_loss_limit = ?, updated_at = ?
-        WHERE user_id = ?
-    """, (bankroll.starting_amount, bankroll.starting_amount, bankroll.max_stake_percent, bankroll.daily_loss_limit, bankroll.weekly_loss_limit, datetime.now().isoformat(), user_id))
-    
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute("""
+            UPDATE bankrolls
+            SET starting_amount = ?, current_amount = ?, max_stake_percent = ?, daily_loss_limit = ?, weekly_loss_limit = ?, updated_at = ?
+            WHERE user_id = ?
+        """, (bankroll.starting_amount, bankroll.starting_amount, bankroll.max_stake_percent, bankroll.daily_loss_limit, bankroll.weekly_loss_limit, datetime.now().isoformat(), user_id))
     
     return {"message": "Bankroll updated", "bankroll": bankroll.starting_amount}
 
@@ -341,13 +386,11 @@ async def create_match(user_id: str, match: MatchInput):
     conn = db.get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO matches (id, user_id, sport, team_a, team_b, odds, market, match_date, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (match_id, user_id, match.sport, match.team_a, match.team_b, match.odds, match.market, match.date, datetime.now().isoformat()))
-    
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute("""
+            INSERT INTO matches (id, user_id, sport, team_a, team_b, odds, market, match_date, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (match_id, user_id, match.sport, match.team_a, match.team_b, match.odds, match.market, match.date, datetime.now().isoformat()))
     
     return {"match_id": match_id, "message": "Match created"}
 
@@ -360,8 +403,6 @@ async def list_matches(user_id: str):
     cursor.execute("SELECT * FROM matches WHERE user_id = ?", (user_id,))
     matches = cursor.fetchall()
     
-    conn.close()
-    
     return [dict(m) for m in matches]
 
 # BET SUGGESTION ENDPOINT (CORE!)
@@ -388,7 +429,7 @@ async def suggest_bet(user_id: str, match: MatchInput):
     skill_analysis = run_sportsbet_advisor_skill(f"{match.team_a} vs {match.team_b}")
     confidence = skill_analysis.get("confidence", 0.55)
     
-    # Generate suggestion using core engine
+    # Generate suggestion using core engine (pure computation: no thread hop)
     engine = BetSuggestionEngine(user)
     suggestion = engine.suggest(match_obj, use_skills=True)
     
@@ -400,7 +441,7 @@ async def suggest_bet(user_id: str, match: MatchInput):
     suggestion.expected_value = (confidence * match.odds) - 1
     suggestion.recommended_stake = user.bankroll * (suggestion.recommended_stake / user.bankroll)
     
-    return json.loads(suggestion.to_json())
+    return suggestion.to_dict()
 
 # BET PLACEMENT ENDPOINT
 
@@ -416,17 +457,15 @@ async def place_bet(user_id: str, bet: BetPlacement):
     conn = db.get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO bets (id, user_id, match_id, strategy, stake, odds, confidence, expected_value, result, placed_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (bet_id, user_id, bet.match_id, bet.strategy, bet.stake, bet.odds, 0.6, 0.05, "pending", datetime.now().isoformat()))
-    
-    # Update bankroll
     new_balance = user.bankroll - bet.stake
-    cursor.execute("UPDATE bankrolls SET current_amount = ? WHERE user_id = ?", (new_balance, user_id))
-    
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor.execute("""
+            INSERT INTO bets (id, user_id, match_id, strategy, stake, odds, confidence, expected_value, result, placed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (bet_id, user_id, bet.match_id, bet.strategy, bet.stake, bet.odds, 0.6, 0.05, "pending", datetime.now().isoformat()))
+        
+        # Update bankroll
+        cursor.execute("UPDATE bankrolls SET current_amount = ? WHERE user_id = ?", (new_balance, user_id))
     
     return {
         "bet_id": bet_id,
@@ -446,14 +485,15 @@ async def get_roi(user_id: str):
     cursor.execute("""
         SELECT 
             COUNT(*) as total_bets,
-            SUM(CASE WHEN result = 'win' THEN 1 ELSE 0 END) as wins,
-            SUM(CASE WHEN result = 'loss' THEN 1 ELSE 0 END) as losses,
-            SUM(profit_loss) as total_profit
-        FROM bets WHERE user_id = ?
+            SUM(bt.result = 'win') as wins,
+            SUM(bt.result = 'loss') as losses,
+            COALESCE(SUM(bt.profit_loss), 0) as total_profit,
+            ROUND(COALESCE(SUM(bt.profit_loss), 0) * 100.0 / b.starting_amount, 4) as roi
+        FROM bets bt JOIN bankrolls b ON b.user_id = bt.user_id
+        WHERE bt.user_id = ?
     """, (user_id,))
     
     stats = cursor.fetchone()
-    conn.close()
     
     if not stats or stats['total_bets'] == 0:
         return {
@@ -468,8 +508,8 @@ async def get_roi(user_id: str):
         "wins": stats['wins'] or 0,
         "losses": stats['losses'] or 0,
         "win_rate": ((stats['wins'] or 0) / stats['total_bets']) * 100 if stats['total_bets'] > 0 else 0,
-        "total_profit": stats['total_profit'] or 0,
-        "roi": ((stats['total_profit'] or 0) / 1000) * 100  # Assuming starting bankroll of 1000
+        "total_profit": stats['total_profit'],
+        "roi": stats['roi'] or 0  # Relative to the user's starting bankroll
     }
 
 # ==================== MAIN ====================
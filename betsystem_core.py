@@ -5,14 +5,17 @@ Integrates with available skills: sportsbet-advisor, game-theory, tavily-search,
 """
 
 import json
+import math
+from array import array
 import subprocess
-from typing import Dict, List, Optional
+import time
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 # ==================== DATA MODELS ====================
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: str
     email: str
@@ -21,7 +24,7 @@ class User:
     daily_loss_limit: float
     stop_loss_locked: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Match:
     id: str
     sport: str
@@ -31,7 +34,66 @@ class Match:
     market: str
     date: str
 
-@dataclass
+class MatchTable:
+    """
+    Columnar collection of matches
+    
+    Holds one column per Match field (odds as a float64 array) so batch
+    scoring reads contiguous columns. Indexing and iteration build Match
+    records on demand.
+    """
+    
+    def __init__(self):
+        self.ids: List[str] = []
+        self.sports: List[str] = []
+        self.team_as: List[str] = []
+        self.team_bs: List[str] = []
+        self.odds = array('d')
+        self.markets: List[str] = []
+        self.dates: List[str] = []
+    
+    @classmethod
+    def from_matches(cls, matches: List[Match]) -> "MatchTable":
+        table = cls()
+        for match in matches:
+            table.append(match)
+        return table
+    
+    def append(self, match: Match):
+        self.ids.append(match.id)
+        self.sports.append(match.sport)
+        self.team_as.append(match.team_a)
+        self.team_bs.append(match.team_b)
+        self.odds.append(match.odds)
+        self.markets.append(match.market)
+        self.dates.append(match.date)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: int) -> Match:
+        return Match(self.ids[index], self.sports[index], self.team_as[index],
+                     self.team_bs[index], self.odds[index], self.markets[index],
+                     self.dates[index])
+    
+    def __iter__(self):
+        for row in zip(self.ids, self.sports, self.team_as, self.team_bs,
+                       self.odds, self.markets, self.dates):
+            yield Match(*row)
+    
+    def to_dict(self) -> Dict[str, list]:
+        """Column-oriented dict, serialisable with a single json.dumps"""
+        return {
+            "id": self.ids,
+            "sport": self.sports,
+            "team_a": self.team_as,
+            "team_b": self.team_bs,
+            "odds": self.odds.tolist(),
+            "market": self.markets,
+            "date": self.dates
+        }
+
+@dataclass(slots=True)
 class BetSuggestion:
     strategy: str
     sport: str
@@ -45,25 +107,48 @@ class BetSuggestion:
     risk_level: str
     explanation: List[str]
     
+    def to_dict(self) -> Dict:
+        """Convert to dictionary"""
+        return {
+            "strategy": self.strategy,
+            "sport": self.sport,
+            "match": self.match,
+            "bet_type": self.bet_type,
+            "odds": self.odds,
+            "confidence": self.confidence,
+            "expected_value": self.expected_value,
+            "recommended_stake": self.recommended_stake,
+            "stake_unit": self.stake_unit,
+            "risk_level": self.risk_level,
+            "explanation": list(self.explanation)
+        }
+    
     def to_json(self):
-        return json.dumps(asdict(self), indent=2)
+        return json.dumps(self.to_dict(), indent=2)
 
 # ==================== SKILL INTEGRATIONS ====================
 
+# Polymarket lookups are memoised per cron window (15 min); the bucket number
+# is part of the cache key so entries from an earlier window are never hit
+SKILL_CACHE_WINDOW = 900  # seconds
+
+def _cache_bucket() -> int:
+    """Current skill-cache window number"""
+    return int(time.time() // SKILL_CACHE_WINDOW)
+
 class SkillIntegrator:
     """Integrate with available OpenClaw skills"""
     
     @staticmethod
-    def run_skill(skill_path: str, command: str) -> str:
-        """Run skill command and return output"""
+    def _run(argv: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
+        """Exec a skill command directly (argv list, no shell)"""
+        return subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
+    
+    @staticmethod
+    def run_skill(skill_path: str, command: List[str]) -> str:
+        """Run skill command (argv list) and return output"""
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = SkillIntegrator._run(command)
             if result.returncode == 0:
                 return result.stdout
             else:
@@ -89,21 +174,36 @@ class SkillIntegrator:
         
         return analysis
     
+    # (query, cache window) -> odds. Failed lookups are not cached, so a
+    # transient error does not blank the odds for the rest of the window
+    _polymarket_cache: Dict[Tuple[str, int], Dict] = {}
+    POLYMARKET_CACHE_MAX = 1024
+    
     @staticmethod
     def get_polymarket_odds(query: str) -> Optional[Dict]:
         """Use polymarket skill to get real odds"""
-        skill_cmd = f"""
-        node /data/.openclaw/workspace/skills/polymarket-odds/polymarket.mjs search "{query}"
-        """
+        cache = SkillIntegrator._polymarket_cache
+        key = (query, _cache_bucket())
+        odds = cache.get(key)
+        if odds is None:
+            odds = SkillIntegrator._polymarket_odds(query)
+            if odds is None:
+                return None
+            if len(cache) >= SkillIntegrator.POLYMARKET_CACHE_MAX:
+                del cache[next(iter(cache))]  # Oldest entry
+            cache[key] = odds
+        # Callers get their own copy of the cached dict
+        return dict(odds)
+    
+    @staticmethod
+    def _polymarket_odds(query: str) -> Optional[Dict]:
+        skill_cmd = [
+            "node", "/data/.openclaw/workspace/skills/polymarket-odds/polymarket.mjs",
+            "search", query
+        ]
         
         try:
-            result = subprocess.run(
-                skill_cmd,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
+            result = SkillIntegrator._run(skill_cmd, timeout=15)
             
             if result.returncode == 0:
                 return {
@@ -124,6 +224,11 @@ class SkillIntegrator:
             "team_b": team_b,
             "research_available": True
         }
+    
+    @staticmethod
+    def clear_cache():
+        """Drop all memoised Polymarket odds (e.g. at the start of a cron cycle)"""
+        SkillIntegrator._polymarket_cache.clear()
 
 # ==================== BETTING STRATEGIES ====================
 
@@ -149,19 +254,11 @@ class KellyCriterion:
     @staticmethod
     def calculate(bankroll: float, odds: float, confidence: float, max_kelly: float = 0.25) -> float:
         """Kelly Criterion: f* = (bp - q) / b"""
-        b = odds - 1  # Decimal odds - 1
-        p = confidence  # Probability
-        q = 1 - p
-        
-        # Kelly formula
-        kelly_fraction = (b * p - q) / b if b > 0 else 0
-        
-        # Apply max Kelly (safety cap at 25%)
-        kelly_fraction = min(kelly_fraction, max_kelly)
-        kelly_fraction = max(kelly_fraction, 0)  # No negative stakes
-        
-        stake = bankroll * kelly_fraction
-        expected_value = (confidence * odds) - 1
+        # The formula lives in calculate_batch; this is a batch of one
+        stakes, expected_values, kelly_fractions = KellyCriterion.calculate_batch(
+            bankroll, [odds], [confidence], max_kelly
+        )
+        stake, expected_value, kelly_fraction = stakes[0], expected_values[0], kelly_fractions[0]
         
         return {
             "strategy": "Kelly Criterion",
@@ -170,6 +267,29 @@ class KellyCriterion:
             "expected_value": expected_value,
             "risk_level": "Medium" if kelly_fraction > 0.15 else "Low"
         }
+    
+    @staticmethod
+    def calculate_batch(bankroll: float, odds: List[float], confidences: List[float],
+                        max_kelly: float = 0.25) -> Tuple[List[float], List[float], List[float]]:
+        """
+        Score many matches at once without building a result dict per match
+        
+        Returns:
+            Tuple of (stakes, expected_values, kelly_fractions), index-aligned
+            with the inputs
+        """
+        stakes = []
+        expected_values = []
+        kelly_fractions = []
+        for o, p in zip(odds, confidences):
+            b = o - 1  # Decimal odds - 1; p is the win probability
+            kelly_fraction = (b * p - (1 - p)) / b if b > 0 else 0
+            # Apply max Kelly (safety cap), no negative stakes
+            kelly_fraction = max(min(kelly_fraction, max_kelly), 0)
+            stakes.append(bankroll * kelly_fraction)
+            expected_values.append(p * o - 1)
+            kelly_fractions.append(kelly_fraction)
+        return stakes, expected_values, kelly_fractions
 
 class ValueBetting:
     """Bet when odds > implied probability"""
@@ -206,17 +326,14 @@ class PoissonModel:
     @staticmethod
     def calculate(team_a_avg: float, team_b_avg: float, odds: float) -> Dict:
         """Poisson model for goal predictions"""
-        import math
+        lam = team_a_avg + team_b_avg
         
-        # Poisson probability
-        def poisson_prob(lambda_param: float, k: int) -> float:
-            return (math.exp(-lambda_param) * (lambda_param ** k)) / math.factorial(k)
+        # Poisson probabilities via the recurrence P(k) = P(k-1) * lambda / k
+        prob_0 = math.exp(-lam)
+        prob_1 = prob_0 * lam
+        prob_2 = prob_1 * lam / 2
         
         # Over 2.5 goals probability
-        prob_0 = poisson_prob(team_a_avg + team_b_avg, 0)
-        prob_1 = poisson_prob(team_a_avg + team_b_avg, 1)
-        prob_2 = poisson_prob(team_a_avg + team_b_avg, 2)
-        
         prob_over_2_5 = 1 - (prob_0 + prob_1 + prob_2)
         
         return {
@@ -235,11 +352,14 @@ class PoissonModel:
 class ELORating:
     """Team strength via ELO rating"""
     
+    # 10 ** (diff / 400) == exp(diff * ln(10) / 400)
+    _DIFF_SCALE = math.log(10) / 400
+    
     @staticmethod
     def calculate(elo_a: float, elo_b: float, odds: float) -> Dict:
         """ELO rating model"""
         # ELO win probability formula
-        expected_a = 1 / (1 + 10 ** ((elo_b - elo_a) / 400))
+        expected_a = 1 / (1 + math.exp((elo_b - elo_a) * ELORating._DIFF_SCALE))
         
         return {
             "strategy": "ELO Rating",
@@ -287,7 +407,7 @@ class RiskManager:
     @staticmethod
     def check_daily_limit(user: User, losses_today: float) -> bool:
         """Check daily loss limit"""
-        return (losses_today + user.daily_loss_limit) <= user.daily_loss_limit
+        return losses_today <= user.daily_loss_limit
     
     @staticmethod
     def enforce_stop_loss(user: User) -> bool:
@@ -295,72 +415,103 @@ class RiskManager:
         return not user.stop_loss_locked
     
     @staticmethod
-    def validate_stake(stake: float, bankroll: float, max_percent: float) -> bool:
-        """Validate stake against bankroll"""
+    def validate_stake(stake: Union[float, List[float]], bankroll: float,
+                       max_percent: float) -> Union[bool, List[bool]]:
+        """Validate stake against bankroll (a sequence of stakes gives a mask)"""
         max_stake = bankroll * (max_percent / 100)
-        return stake <= max_stake
+        if isinstance(stake, (int, float)):
+            return stake <= max_stake
+        return [s <= max_stake for s in stake]
 
 # ==================== BET SUGGESTION ENGINE ====================
 
 class BetSuggestionEngine:
     """Generate bet suggestions using all strategies"""
     
+    # Explanation lines, filled per match with str.format_map
+    EXPLANATION_TEMPLATE = (
+        "Using Kelly Criterion strategy",
+        "Confidence: {confidence:.1%}",
+        "Odds imply: {implied:.1%} probability",
+        "Expected Value: {ev:.2%}",
+        "Recommended stake: ${stake:.2f} ({stake_pct:.1f}% of bankroll)"
+    )
+    
     def __init__(self, user: User):
         self.user = user
         self.skills = SkillIntegrator()
     
     def suggest(self, match: Match, use_skills: bool = True) -> Optional[BetSuggestion]:
         """Generate bet suggestion for a match"""
+        suggestions = self.suggest_batch([match], use_skills)
+        return suggestions[0] if suggestions else None
+    
+    def suggest_batch(self, matches: Union[List[Match], MatchTable],
+                      use_skills: bool = True) -> List[BetSuggestion]:
+        """
+        Generate bet suggestions for many matches in one pass
         
+        Stakes and EVs are scored together by KellyCriterion.calculate_batch;
+        BetSuggestion objects are only built at the end. A MatchTable's odds
+        column is scored directly.
+        
+        Returns:
+            One suggestion per match (empty if risk controls block betting)
+        """
         # Risk check
         if not RiskManager.enforce_stop_loss(self.user):
-            return None
+            return []
+        
+        bankroll = self.user.bankroll
         
         # Use sportsbet-advisor skill if available
         if use_skills:
-            analysis = self.skills.get_sportsbet_analysis(match)
-            confidence = analysis.get("confidence", 0.55)
+            confidences = [self.skills.get_sportsbet_analysis(match).get("confidence", 0.55)
+                           for match in matches]
         else:
-            confidence = 0.55  # Default confidence
+            confidences = [0.55] * len(matches)  # Default confidence
         
         # Choose strategy (Kelly Criterion recommended)
-        kelly_calc = KellyCriterion.calculate(
-            self.user.bankroll,
-            match.odds,
-            confidence
-        )
-        
-        stake = kelly_calc["stake"]
-        ev = kelly_calc["expected_value"]
-        risk = kelly_calc["risk_level"]
+        if isinstance(matches, MatchTable):
+            odds = matches.odds
+        else:
+            odds = [match.odds for match in matches]
+        stakes, evs, kelly_fractions = KellyCriterion.calculate_batch(bankroll, odds, confidences)
         
-        # Validate stake
-        if not RiskManager.validate_stake(stake, self.user.bankroll, self.user.max_stake_percent):
-            stake = self.user.bankroll * (self.user.max_stake_percent / 100)
+        # Validate stakes against the per-bet cap
+        within_cap = RiskManager.validate_stake(stakes, bankroll, self.user.max_stake_percent)
+        max_stake = bankroll * (self.user.max_stake_percent / 100)
         
-        explanation = [
-            f"Using Kelly Criterion strategy",
-            f"Confidence: {confidence:.1%}",
-            f"Odds imply: {(1/match.odds):.1%} probability",
-            f"Expected Value: {ev:.2%}",
-            f"Recommended stake: ${stake:.2f} ({(stake/self.user.bankroll)*100:.1f}% of bankroll)"
-        ]
-        
-        suggestion = BetSuggestion(
-            strategy="Kelly Criterion",
-            sport=match.sport,
-            match=f"{match.team_a} vs {match.team_b}",
-            bet_type=match.market,
-            odds=match.odds,
-            confidence=confidence,
-            expected_value=ev,
-            recommended_stake=stake,
-            stake_unit="currency",
-            risk_level=risk,
-            explanation=explanation
-        )
+        suggestions = []
+        for match, confidence, stake, ev, kelly_fraction, valid in zip(
+                matches, confidences, stakes, evs, kelly_fractions, within_cap):
+            if not valid:
+                stake = max_stake
+            
+            values = {
+                "confidence": confidence,
+                "implied": 1 / match.odds,
+                "ev": ev,
+                "stake": stake,
+                "stake_pct": (stake / bankroll) * 100
+            }
+            explanation = [line.format_map(values) for line in self.EXPLANATION_TEMPLATE]
+            
+            suggestions.append(BetSuggestion(
+                strategy="Kelly Criterion",
+                sport=match.sport,
+                match=f"{match.team_a} vs {match.team_b}",
+                bet_type=match.market,
+                odds=match.odds,
+                confidence=confidence,
+                expected_value=ev,
+                recommended_stake=stake,
+                stake_unit="currency",
+                risk_level="Medium" if kelly_fraction > 0.15 else "Low",
+                explanation=explanation
+            ))
         
-        return suggestion
+        return suggestions
 
 # ==================== MAIN ====================
 
@@ -7,36 +7,68 @@ Runs the trading cycle every 15 minutes
 import subprocess
 import json
 import os
+import threading
 from datetime import datetime
 
 LIVE_SCRIPT = "/data/.openclaw/workspace/polymarket_live.py"
 LOG_FILE = "/data/.openclaw/workspace/trading_log.jsonl"
 
+def _append_log(log_entry: dict):
+    """Append one entry to the JSONL log"""
+    line = json.dumps(log_entry, separators=(",", ":")) + "\n"
+    with open(LOG_FILE, 'ab') as f:
+        f.write(line.encode("utf-8"))
+
+def _read_head(stream, limit: int, sink: list):
+    """Keep the first `limit` characters of a pipe and discard the rest"""
+    sink.append(stream.read(limit))
+    while stream.read(65536):
+        pass  # Keep draining so the child never blocks on a full pipe
+    stream.close()
+
 def run_trading_cycle():
     """Execute trading cycle and log results"""
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             ["python3", LIVE_SCRIPT],
-            capture_output=True,
-            text=True,
-            timeout=60
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
         )
         
+        # Only the head of each stream is logged, so only the head is kept
+        stdout, stderr = [], []
+        readers = [
+            threading.Thread(target=_read_head, args=(proc.stdout, 500, stdout), daemon=True),
+            threading.Thread(target=_read_head, args=(proc.stderr, 200, stderr), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        
+        try:
+            returncode = proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        
+        for reader in readers:
+            reader.join()
+        
         log_entry = {
             "timestamp": datetime.now().isoformat(),
-            "success": result.returncode == 0,
-            "stdout": result.stdout[:500],  # First 500 chars
-            "stderr": result.stderr[:200] if result.stderr else None,
+            "success": returncode == 0,
+            "stdout": stdout[0],  # First 500 chars
+            "stderr": stderr[0] or None,  # First 200 chars
         }
         
         # Append to JSONL log
-        with open(LOG_FILE, 'a') as f:
-            f.write(json.dumps(log_entry) + "\n")
+        _append_log(log_entry)
         
-        if result.returncode == 0:
+        if returncode == 0:
             print(f"✅ Trading cycle completed: {datetime.now()}")
         else:
-            print(f"❌ Trading cycle failed: {result.stderr}")
+            print(f"❌ Trading cycle failed: {stderr[0]}")
     
     except subprocess.TimeoutExpired:
         log_entry = {
@@ -44,8 +76,7 @@ def run_trading_cycle():
             "success": False,
             "error": "Timeout (>60s)",
         }
-        with open(LOG_FILE, 'a') as f:
-            f.write(json.dumps(log_entry) + "\n")
+        _append_log(log_entry)
         print(f"❌ Trading cycle timeout")
     
     except Exception as e:
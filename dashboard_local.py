@@ -1,25 +1,33 @@
 #!/usr/bin/env python3
 import json, os, statistics
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, jsonify
 from datetime import datetime
+from functools import lru_cache
 
 app = Flask(__name__)
 POSITION_FILE = "/data/.openclaw/workspace/positions.json"
 TRADES_FILE = "/data/.openclaw/workspace/trades.json"
 EQUITY_FILE = "/data/.openclaw/workspace/equity_live.json"
 
+@lru_cache(maxsize=8)
+def _parse_json(path, mtime_ns):
+    """Parse a JSON file; keyed on mtime so a rewrite invalidates the entry"""
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+def _load_json(path):
+    return _parse_json(path, os.stat(path).st_mtime_ns)
+
 def load_positions():
     try:
-        with open(POSITION_FILE) as f:
-            return json.load(f)
-    except:
+        return _load_json(POSITION_FILE)
+    except (OSError, ValueError):
         return {"positions": [], "count": 0}
 
 def load_trades():
     try:
-        with open(TRADES_FILE) as f:
-            return json.load(f)
-    except:
+        return _load_json(TRADES_FILE)
+    except (OSError, ValueError):
         return {"trades": [], "metrics": {}}
 
 HTML = """
@@ -123,13 +131,16 @@ HTML = """
 </html>
 """
 
+# Compile the page template once instead of on every request
+TEMPLATE = app.jinja_env.from_string(HTML)
+
 @app.route("/")
 def dashboard():
     positions = load_positions()
     trades = load_trades()
     circuit_active = trades.get("circuit_breaker_active", False)
     metrics = trades.get("metrics", {"total_trades": 0, "win_rate": 0, "total_pnl": 0})
-    return render_template_string(HTML, positions=positions, trades=trades, metrics=metrics, circuit_active=circuit_active)
+    return TEMPLATE.render(positions=positions, trades=trades, metrics=metrics, circuit_active=circuit_active)
 
 @app.route("/api/positions")
 def api_positions():
@@ -140,4 +151,5 @@ def api_trades():
     return jsonify(load_trades())
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    # For production: gunicorn -w 4 -k gthread dashboard_local:app
+    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
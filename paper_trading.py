@@ -4,13 +4,31 @@ Simulates real trading without spending actual money
 """
 
 import json
+import logging
 import os
+from array import array
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 from polymarket_strategy import MeanReversionStrategy, Signal, StrategySignal
 
+logger = logging.getLogger(__name__)
+
+_HR = "=" * 70  # Banner rule for console output
+_SIGNALS_HEADER = f"\n{_HR}\nPROCESSING SIGNALS - %d signal(s) to process\n{_HR}"
+_SUMMARY_HEADER = f"\n{_HR}\nPORTFOLIO SUMMARY\n{_HR}"
+_UTC = timezone.utc
+
+
+def compute_pl(entry_price: float, exit_price: float, quantity: float) -> Tuple[float, float]:
+    """P&L in dollars and percent for a position moving from entry_price to exit_price"""
+    price_diff = exit_price - entry_price
+    p_l = price_diff * quantity * 100  # Scale by quantity
+    p_l_percent = (price_diff / entry_price * 100) if entry_price > 0 else 0
+    return p_l, p_l_percent
+
 
 class TradeStatus(Enum):
     """Trade execution status"""
@@ -18,7 +36,7 @@ class TradeStatus(Enum):
     CLOSED = "closed"
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """Represents an open trading position"""
     position_id: str
@@ -31,10 +49,18 @@ class Position:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        return {
+            "position_id": self.position_id,
+            "market_id": self.market_id,
+            "question": self.question,
+            "entry_time": self.entry_time,
+            "entry_price": self.entry_price,
+            "quantity": self.quantity,
+            "signal": self.signal
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class ClosedTrade:
     """Represents a completed trade with P&L"""
     trade_id: str
@@ -52,26 +78,107 @@ class ClosedTrade:
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        return {
+            "trade_id": self.trade_id,
+            "market_id": self.market_id,
+            "question": self.question,
+            "entry_time": self.entry_time,
+            "entry_price": self.entry_price,
+            "exit_time": self.exit_time,
+            "exit_price": self.exit_price,
+            "quantity": self.quantity,
+            "p_l": self.p_l,
+            "p_l_percent": self.p_l_percent,
+            "signal": self.signal,
+            "exit_reason": self.exit_reason
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class TradeMetrics:
     """Performance metrics for trading"""
     total_trades: int = 0
     winning_trades: int = 0
     losing_trades: int = 0
     total_p_l: float = 0.0
-    win_rate: float = 0.0
     consecutive_wins: int = 0
     consecutive_losses: int = 0
     max_consecutive_losses: int = 0
-    avg_win: float = 0.0
-    avg_loss: float = 0.0
+    winning_p_l: float = 0.0  # Sum of P&L over winning trades
+    losing_p_l: float = 0.0  # Sum of P&L over losing trades
+    
+    def record(self, p_l: float) -> bool:
+        """
+        Count one closed trade's P&L in the totals and streaks
+        
+        Returns:
+            True if the losing streak has reached the circuit breaker limit
+        """
+        self.total_trades += 1
+        self.total_p_l += p_l
+        
+        if p_l > 0:
+            self.winning_trades += 1
+            self.consecutive_wins += 1
+            self.consecutive_losses = 0  # Reset loss counter
+            self.winning_p_l += p_l
+            return False
+        
+        self.losing_trades += 1
+        self.consecutive_losses += 1
+        self.losing_p_l += p_l
+        self.consecutive_wins = 0  # Reset win counter
+        
+        # Track max consecutive losses
+        if self.consecutive_losses > self.max_consecutive_losses:
+            self.max_consecutive_losses = self.consecutive_losses
+        
+        # Circuit breaker trips after 3 consecutive losses
+        return self.consecutive_losses >= 3
+    
+    @property
+    def win_rate(self) -> float:
+        return self.winning_trades / self.total_trades * 100 if self.total_trades > 0 else 0.0
+    
+    @property
+    def avg_win(self) -> float:
+        return self.winning_p_l / self.winning_trades if self.winning_trades > 0 else 0.0
+    
+    @property
+    def avg_loss(self) -> float:
+        return self.losing_p_l / self.losing_trades if self.losing_trades > 0 else 0.0
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TradeMetrics":
+        """Build from a to_dict() payload; derived values are recomputed, not read"""
+        return cls(
+            total_trades=data.get("total_trades", 0),
+            winning_trades=data.get("winning_trades", 0),
+            losing_trades=data.get("losing_trades", 0),
+            total_p_l=data.get("total_p_l", 0.0),
+            consecutive_wins=data.get("consecutive_wins", 0),
+            consecutive_losses=data.get("consecutive_losses", 0),
+            max_consecutive_losses=data.get("max_consecutive_losses", 0),
+            winning_p_l=data.get("winning_p_l", 0.0),
+            losing_p_l=data.get("losing_p_l", 0.0)
+        )
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        return {
+            "total_trades": self.total_trades,
+            "winning_trades": self.winning_trades,
+            "losing_trades": self.losing_trades,
+            "total_p_l": self.total_p_l,
+            "win_rate": self.win_rate,
+            "consecutive_wins": self.consecutive_wins,
+            "consecutive_losses": self.consecutive_losses,
+            "max_consecutive_losses": self.max_consecutive_losses,
+            "avg_win": self.avg_win,
+            "avg_loss": self.avg_loss,
+            "winning_p_l": self.winning_p_l,
+            "losing_p_l": self.losing_p_l
+        }
 
 
 class PaperTradingEngine:
@@ -85,95 +192,229 @@ class PaperTradingEngine:
     - Closes positions on exit signals
     - Tracks closed trades with realized P&L
     - Circuit breaker: stops after 3 consecutive losses
+    
+    Trade history is an append-only JSONL log (trades.jsonl next to
+    trades.json); trades.json is a small snapshot with the metrics, the
+    circuit breaker state and the most recent trades.
     """
     
+    # Number of most recent trades kept in the trades.json snapshot
+    RECENT_TRADES = 10
+    
     def __init__(self, positions_file: str = "positions.json", trades_file: str = "trades.json"):
         """
         Initialize trading engine
         
         Args:
             positions_file: File to store open positions
-            trades_file: File to store trade history
+            trades_file: File to store the trade snapshot (metrics + recent trades)
         """
         self.positions_file = positions_file
         self.trades_file = trades_file
+        self.trades_log_file = os.path.splitext(trades_file)[0] + ".jsonl"
         
         # In-memory state
         self.positions: Dict[str, Position] = {}
+        self.positions_by_market: Dict[str, str] = {}  # market_id -> position_id
         self.closed_trades: List[ClosedTrade] = []
+        self.trade_pls = array('d')  # p_l column parallel to closed_trades
         self.metrics = TradeMetrics()
         self.circuit_breaker_active = False
+        self._save_deferred = False  # Set while process_signals batches its writes
+        self._batch_now: Optional[str] = None  # One timestamp shared by a process_signals batch
+        self._next_id = 0  # Shared sequence for position and trade IDs
+        self._trades_log_fp = None  # Append handle for the trade log, opened on first write
         
         # Load existing state
         self._load_positions()
         self._load_trades()
+        self._seed_id_sequence()
     
     def _load_positions(self):
         """Load open positions from file"""
         if os.path.exists(self.positions_file):
             try:
-                with open(self.positions_file, "r") as f:
-                    data = json.load(f)
+                with open(self.positions_file, "rb") as f:
+                    data = json.loads(f.read())
                     for pos_data in data.get("positions", []):
                         pos = Position(**pos_data)
                         self.positions[pos.position_id] = pos
+                        self.positions_by_market.setdefault(pos.market_id, pos.position_id)
             except Exception as e:
-                print(f"Warning: Could not load positions: {e}")
+                logger.warning("Could not load positions: %s", e)
     
     def _load_trades(self):
         """Load trade history and metrics from file"""
+        has_log = os.path.exists(self.trades_log_file)
+        if has_log:
+            try:
+                with open(self.trades_log_file, "rb") as f:
+                    for line_no, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            self.closed_trades.append(ClosedTrade(**json.loads(line)))
+                        except (ValueError, TypeError) as e:
+                            # e.g. a line cut off by a crash mid-write
+                            logger.warning("Skipping bad line %d of %s: %s",
+                                           line_no, self.trades_log_file, e)
+            except Exception as e:
+                logger.warning("Could not load trade log: %s", e)
+        
         if os.path.exists(self.trades_file):
             try:
-                with open(self.trades_file, "r") as f:
-                    data = json.load(f)
+                with open(self.trades_file, "rb") as f:
+                    data = json.loads(f.read())
                     
-                    # Load closed trades
-                    for trade_data in data.get("trades", []):
-                        trade = ClosedTrade(**trade_data)
-                        self.closed_trades.append(trade)
+                    # Older snapshots hold the full history: migrate it to the log.
+                    # A current snapshot only holds the last RECENT_TRADES trades,
+                    # which must not be mistaken for the whole history.
+                    trades = data.get("trades")
+                    if not has_log and trades and len(trades) == data.get("count"):
+                        for trade_data in trades:
+                            self.closed_trades.append(ClosedTrade(**trade_data))
+                        self._append_trades(self.closed_trades)
                     
                     # Load metrics
                     metrics_data = data.get("metrics", {})
-                    self.metrics = TradeMetrics(**metrics_data)
+                    self.metrics = TradeMetrics.from_dict(metrics_data)
                     
                     # Load circuit breaker status
                     self.circuit_breaker_active = data.get("circuit_breaker_active", False)
             except Exception as e:
-                print(f"Warning: Could not load trades: {e}")
+                logger.warning("Could not load trades: %s", e)
+        
+        self.trade_pls = array('d', [t.p_l for t in self.closed_trades])
+        # The trade log is authoritative for the P&L sums (older snapshots lack them)
+        if self.trade_pls:
+            self.metrics.winning_p_l = sum(p_l for p_l in self.trade_pls if p_l > 0)
+            self.metrics.losing_p_l = sum(p_l for p_l in self.trade_pls if p_l <= 0)
+    
+    def _now_iso(self) -> str:
+        """Current UTC time as ISO 8601, fixed for the duration of a signal batch"""
+        if self._batch_now is not None:
+            return self._batch_now
+        return datetime.now(_UTC).isoformat()
+    
+    def _maybe_save_positions(self):
+        """Save open positions unless a batch is deferring writes"""
+        if not self._save_deferred:
+            self._save_positions()
+    
+    def _maybe_save_trades(self):
+        """Save the trade snapshot unless a batch is deferring writes"""
+        if not self._save_deferred:
+            self._save_trades()
+    
+    @contextmanager
+    def deferred_saves(self):
+        """
+        Coalesce the position and trade snapshot writes of a block of
+        open/close calls into one write of each file when the block exits
+        """
+        if self._save_deferred:
+            # Already inside a batch: the outer block does the write
+            yield
+            return
+        self._save_deferred = True
+        try:
+            yield
+        finally:
+            self._save_deferred = False
+            self._sync_trade_log()
+            self._save_positions()
+            self._save_trades()
+    
+    @staticmethod
+    def _atomic_write(path: str, text: str):
+        """Write a file via a temp file and rename, so readers never see a partial file"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(text.encode("utf-8"))
+        os.replace(tmp_path, path)
     
     def _save_positions(self):
         """Save open positions to file"""
         positions_list = [pos.to_dict() for pos in self.positions.values()]
         data = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": self._now_iso(),
             "count": len(positions_list),
             "positions": positions_list
         }
-        with open(self.positions_file, "w") as f:
-            json.dump(data, f, indent=2)
+        self._atomic_write(self.positions_file, json.dumps(data, separators=(",", ":")))
+    
+    def _append_trades(self, trades: List[ClosedTrade]):
+        """Append closed trades to the JSONL trade log"""
+        lines = "".join(json.dumps(trade.to_dict(), separators=(",", ":")) + "\n"
+                        for trade in trades)
+        if self._trades_log_fp is None:
+            fp = open(self.trades_log_file, "ab", buffering=64 * 1024)
+            # A write cut off mid-line leaves no trailing newline: start a fresh
+            # line so the next record is not glued onto the broken one
+            if fp.tell() and not self._ends_with_newline(self.trades_log_file):
+                fp.write(b"\n")
+            self._trades_log_fp = fp
+        self._trades_log_fp.write(lines.encode("utf-8"))
+        self._trades_log_fp.flush()
+        if not self._save_deferred:
+            self._sync_trade_log()
+    
+    def _sync_trade_log(self):
+        """fsync the trade log: it is the only full trade history"""
+        if self._trades_log_fp is not None:
+            os.fsync(self._trades_log_fp.fileno())
+    
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+    
+    def close(self):
+        """Close the trade log handle (it is reopened on the next append)"""
+        if self._trades_log_fp is not None:
+            self._sync_trade_log()
+            self._trades_log_fp.close()
+            self._trades_log_fp = None
+    
+    def __enter__(self) -> "PaperTradingEngine":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def _save_trades(self):
-        """Save trade history to file"""
-        trades_list = [trade.to_dict() for trade in self.closed_trades]
+        """Save the trade snapshot (metrics + most recent trades) to file"""
         data = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "count": len(trades_list),
-            "trades": trades_list,
+            "timestamp": self._now_iso(),
+            "count": len(self.closed_trades),
+            "trades": [trade.to_dict() for trade in self.closed_trades[-self.RECENT_TRADES:]],
             "metrics": self.metrics.to_dict(),
             "circuit_breaker_active": self.circuit_breaker_active
         }
-        with open(self.trades_file, "w") as f:
-            json.dump(data, f, indent=2)
+        self._atomic_write(self.trades_file, json.dumps(data, separators=(",", ":")))
+    
+    @staticmethod
+    def _id_sequence(record_id: str) -> int:
+        """Sequence number at the end of a generated ID (-1 for legacy timestamp IDs)"""
+        suffix = record_id.rsplit("_", 1)[-1]
+        return int(suffix) if suffix.isdigit() else -1
+    
+    def _seed_id_sequence(self):
+        """Continue ID numbering after the highest ID already on disk"""
+        ids = [pos.position_id for pos in self.positions.values()]
+        ids.extend(trade.trade_id for trade in self.closed_trades)
+        self._next_id = max((self._id_sequence(i) for i in ids), default=-1) + 1
     
     def _generate_position_id(self, market_id: str) -> str:
         """Generate unique position ID"""
-        timestamp = datetime.now(timezone.utc).isoformat().replace(":", "-")
-        return f"pos_{market_id}_{timestamp}"
+        self._next_id += 1
+        return f"pos_{market_id}_{self._next_id - 1}"
     
     def _generate_trade_id(self, market_id: str) -> str:
         """Generate unique trade ID"""
-        timestamp = datetime.now(timezone.utc).isoformat().replace(":", "-")
-        return f"trade_{market_id}_{timestamp}"
+        self._next_id += 1
+        return f"trade_{market_id}_{self._next_id - 1}"
     
     def open_position(self, signal: StrategySignal) -> Optional[Position]:
         """
@@ -187,7 +428,7 @@ class PaperTradingEngine:
         """
         # Check circuit breaker
         if self.circuit_breaker_active:
-            print(f"⚠️  Circuit breaker active - trading halted after 3 consecutive losses")
+            logger.info("⚠️  Circuit breaker active - trading halted after 3 consecutive losses")
             return None
         
         # Only open on BUY signals
@@ -195,10 +436,9 @@ class PaperTradingEngine:
             return None
         
         # Check if we already have a position in this market
-        for pos in self.positions.values():
-            if pos.market_id == signal.market_id:
-                print(f"⚠️  Position already open in {signal.market_id}")
-                return None
+        if signal.market_id in self.positions_by_market:
+            logger.info("⚠️  Position already open in %s", signal.market_id)
+            return None
         
         # Create position
         position = Position(
@@ -212,10 +452,11 @@ class PaperTradingEngine:
         )
         
         self.positions[position.position_id] = position
-        self._save_positions()
+        self.positions_by_market[position.market_id] = position.position_id
+        self._maybe_save_positions()
         
-        print(f"✅ BUY: Position opened in {signal.market_id}")
-        print(f"   Entry Price: {position.entry_price:.2%} | Size: ${position.quantity:.2f}")
+        logger.info("✅ BUY: Position opened in %s\n   Entry Price: %.2f%% | Size: $%.2f",
+                    signal.market_id, position.entry_price * 100, position.quantity)
         
         return position
     
@@ -237,9 +478,7 @@ class PaperTradingEngine:
         position = self.positions[position_id]
         
         # Calculate P&L
-        price_diff = exit_price - position.entry_price
-        p_l = price_diff * position.quantity * 100  # Scale by quantity
-        p_l_percent = ((exit_price - position.entry_price) / position.entry_price * 100) if position.entry_price > 0 else 0
+        p_l, p_l_percent = compute_pl(position.entry_price, exit_price, position.quantity)
         
         # Create closed trade record
         trade = ClosedTrade(
@@ -248,7 +487,7 @@ class PaperTradingEngine:
             question=position.question,
             entry_time=position.entry_time,
             entry_price=position.entry_price,
-            exit_time=datetime.now(timezone.utc).isoformat(),
+            exit_time=self._now_iso(),
             exit_price=exit_price,
             quantity=position.quantity,
             p_l=p_l,
@@ -258,62 +497,33 @@ class PaperTradingEngine:
         )
         
         self.closed_trades.append(trade)
+        self.trade_pls.append(p_l)
+        self._append_trades([trade])
         
         # Update metrics
         self._update_metrics(trade)
         
         # Remove position
         del self.positions[position_id]
+        if self.positions_by_market.get(position.market_id) == position_id:
+            del self.positions_by_market[position.market_id]
         
         # Save state
-        self._save_positions()
-        self._save_trades()
+        self._maybe_save_positions()
+        self._maybe_save_trades()
         
         # Log trade
-        symbol = "📈" if p_l > 0 else "📉"
-        print(f"{symbol} SELL: Position closed in {position.market_id}")
-        print(f"   Entry: {position.entry_price:.2%} | Exit: {exit_price:.2%}")
-        print(f"   P&L: ${p_l:+.2f} ({p_l_percent:+.1f}%) | Reason: {exit_reason}")
+        logger.info("%s SELL: Position closed in %s\n   Entry: %.2f%% | Exit: %.2f%%\n   P&L: $%+.2f (%+.1f%%) | Reason: %s",
+                    "📈" if p_l > 0 else "📉", position.market_id, position.entry_price * 100, exit_price * 100,
+                    p_l, p_l_percent, exit_reason)
         
         return trade
     
     def _update_metrics(self, trade: ClosedTrade):
         """Update trading metrics after a trade closes"""
-        self.metrics.total_trades += 1
-        self.metrics.total_p_l += trade.p_l
-        
-        is_winning = trade.p_l > 0
-        
-        if is_winning:
-            self.metrics.winning_trades += 1
-            self.metrics.consecutive_wins += 1
-            self.metrics.consecutive_losses = 0  # Reset loss counter
-        else:
-            self.metrics.losing_trades += 1
-            self.metrics.consecutive_losses += 1
-            self.metrics.consecutive_wins = 0  # Reset win counter
-            
-            # Track max consecutive losses
-            if self.metrics.consecutive_losses > self.metrics.max_consecutive_losses:
-                self.metrics.max_consecutive_losses = self.metrics.consecutive_losses
-            
-            # Activate circuit breaker after 3 consecutive losses
-            if self.metrics.consecutive_losses >= 3:
-                self.circuit_breaker_active = True
-                print(f"🔴 CIRCUIT BREAKER ACTIVATED after {self.metrics.consecutive_losses} consecutive losses")
-        
-        # Calculate win rate
-        if self.metrics.total_trades > 0:
-            self.metrics.win_rate = self.metrics.winning_trades / self.metrics.total_trades * 100
-        
-        # Calculate average win/loss
-        if self.metrics.winning_trades > 0:
-            winning_pls = [t.p_l for t in self.closed_trades if t.p_l > 0]
-            self.metrics.avg_win = sum(winning_pls) / len(winning_pls)
-        
-        if self.metrics.losing_trades > 0:
-            losing_pls = [t.p_l for t in self.closed_trades if t.p_l <= 0]
-            self.metrics.avg_loss = sum(losing_pls) / len(losing_pls) if losing_pls else 0
+        if self.metrics.record(trade.p_l):
+            self.circuit_breaker_active = True
+            logger.info("🔴 CIRCUIT BREAKER ACTIVATED after %d consecutive losses", self.metrics.consecutive_losses)
     
     def reset_circuit_breaker(self, winning_trade: bool = False):
         """
@@ -326,7 +536,7 @@ class PaperTradingEngine:
             self.metrics.consecutive_losses = 0
             if self.circuit_breaker_active:
                 self.circuit_breaker_active = False
-                print(f"🟢 CIRCUIT BREAKER RESET after winning trade")
+                logger.info("🟢 CIRCUIT BREAKER RESET after winning trade")
     
     def calculate_unrealized_pnl(self, market_id: str, current_price: float) -> Tuple[float, float]:
         """
@@ -339,14 +549,12 @@ class PaperTradingEngine:
         Returns:
             Tuple of (unrealized_pnl, unrealized_pnl_percent)
         """
-        for position in self.positions.values():
-            if position.market_id == market_id:
-                price_diff = current_price - position.entry_price
-                unrealized_pnl = price_diff * position.quantity * 100
-                unrealized_pnl_percent = ((current_price - position.entry_price) / position.entry_price * 100) if position.entry_price > 0 else 0
-                return unrealized_pnl, unrealized_pnl_percent
+        position_id = self.positions_by_market.get(market_id)
+        if position_id is None:
+            return 0.0, 0.0
         
-        return 0.0, 0.0
+        position = self.positions[position_id]
+        return compute_pl(position.entry_price, current_price, position.quantity)
     
     def process_signals(self, signals: List[StrategySignal], market_data: Dict[str, Dict]):
         """
@@ -356,24 +564,38 @@ class PaperTradingEngine:
             signals: List of StrategySignal objects from strategy
             market_data: Dict of market_id -> market data for price lookups
         """
-        print(f"\n{'='*70}")
-        print(f"PROCESSING SIGNALS - {len(signals)} signal(s) to process")
-        print(f"{'='*70}")
-        
-        # Process each signal
-        for signal in signals:
-            if signal.signal == Signal.BUY:
-                # Try to open a position
-                self.open_position(signal)
-            
-            elif signal.signal == Signal.SELL:
-                # Check for open positions to close
-                for position_id, position in list(self.positions.items()):
-                    if position.market_id == signal.market_id:
-                        self.close_position(position_id, signal.current_price, "Exit signal from strategy")
+        logger.info(_SIGNALS_HEADER, len(signals))
         
-        # Check exit conditions for open positions
-        self._check_position_exits(market_data)
+        # Write positions and trades once at the end instead of after every trade
+        with self.deferred_saves():
+            self._batch_now = datetime.now(_UTC).isoformat()
+            try:
+                skipped_buys = 0
+            
+                # Process each signal in order (a SELL then BUY on one market must re-open it)
+                for signal in signals:
+                    if signal.signal == Signal.BUY:
+                        # The breaker can trip mid-batch, so it is read per signal, but a
+                        # halted BUY is only counted here instead of going through open_position
+                        if self.circuit_breaker_active:
+                            skipped_buys += 1
+                        else:
+                            # Try to open a position
+                            self.open_position(signal)
+                
+                    elif signal.signal == Signal.SELL:
+                        # Close the open position in this market, if any
+                        position_id = self.positions_by_market.get(signal.market_id)
+                        if position_id is not None:
+                            self.close_position(position_id, signal.current_price, "Exit signal from strategy")
+            
+                if skipped_buys:
+                    logger.info("⚠️  Circuit breaker active - %d BUY signal(s) skipped", skipped_buys)
+            
+                # Check exit conditions for open positions
+                self._check_position_exits(market_data)
+            finally:
+                self._batch_now = None
     
     def _check_position_exits(self, market_data: Dict[str, Dict]):
         """
@@ -382,19 +604,73 @@ class PaperTradingEngine:
         Args:
             market_data: Dict of market_id -> market data
         """
-        for position_id, position in list(self.positions.items()):
-            if position.market_id in market_data:
-                market = market_data[position.market_id]
-                current_price = market.get("yes_price", 0.5)
-                days_to_expiry = market.get("days_to_expiry", 0)
-                
-                # Check for profit-taking
-                if current_price > 0.70:  # Good profit
-                    self.close_position(position_id, current_price, "Profit target reached (>70%)")
-                
-                # Check for expiration
-                elif days_to_expiry < 0.1:  # Less than 2.4 hours
-                    self.close_position(position_id, current_price, "Position expiring soon")
+        # Decide first, then close: only exiting positions are collected, and
+        # closing cannot disturb the index while it is being walked
+        exits = []
+        get_market = market_data.get
+        for market_id, position_id in self.positions_by_market.items():
+            market = get_market(market_id)
+            if market is None:
+                continue
+            current_price = market.get("yes_price", 0.5)
+            
+            # Check for profit-taking
+            if current_price > 0.70:  # Good profit
+                exits.append((position_id, current_price, "Profit target reached (>70%)"))
+            
+            # Check for expiration (expiry is only read when the price check fails)
+            elif market.get("days_to_expiry", 0) < 0.1:  # Less than 2.4 hours
+                exits.append((position_id, current_price, "Position expiring soon"))
+        
+        for position_id, current_price, reason in exits:
+            self.close_position(position_id, current_price, reason)
+    
+    @staticmethod
+    def replay(rounds: Iterable[Tuple[List[StrategySignal], Dict[str, Dict]]]) -> TradeMetrics:
+        """
+        Replay historical signal rounds in memory and return the resulting metrics
+        
+        Applies the same rules as process_signals (entries, strategy exits,
+        profit target, expiry, circuit breaker) but keeps only entry price and
+        size per open market: no files, no log output and no trade records.
+        Meant for offline parameter sweeps; use process_signals for live trading.
+        
+        Args:
+            rounds: Iterable of (signals, market_data) pairs in time order
+            
+        Returns:
+            TradeMetrics for the replayed session
+        """
+        metrics = TradeMetrics()
+        open_markets: Dict[str, Tuple[float, float]] = {}  # market_id -> (entry_price, quantity)
+        halted = False  # Circuit breaker; stays tripped for the rest of the replay
+        
+        def settle(market_id: str, exit_price: float):
+            nonlocal halted
+            entry_price, quantity = open_markets.pop(market_id)
+            if metrics.record(compute_pl(entry_price, exit_price, quantity)[0]):
+                halted = True
+        
+        for signals, market_data in rounds:
+            for signal in signals:
+                if signal.signal == Signal.BUY:
+                    if not halted and signal.market_id not in open_markets:
+                        open_markets[signal.market_id] = (signal.current_price, signal.position_size)
+                elif signal.signal == Signal.SELL and signal.market_id in open_markets:
+                    settle(signal.market_id, signal.current_price)
+            
+            get_market = market_data.get
+            exits = []
+            for market_id in open_markets:
+                market = get_market(market_id)
+                if market is not None:
+                    current_price = market.get("yes_price", 0.5)
+                    if current_price > 0.70 or market.get("days_to_expiry", 0) < 0.1:
+                        exits.append((market_id, current_price))
+            for market_id, current_price in exits:
+                settle(market_id, current_price)
+        
+        return metrics
     
     def get_portfolio_summary(self) -> Dict:
         """
@@ -404,15 +680,10 @@ class PaperTradingEngine:
             Dict with portfolio metrics
         """
         open_positions = len(self.positions)
-        total_unrealized_pnl = 0.0
-        
-        for position in self.positions.values():
-            # Would need current market price to calculate actual unrealized P&L
-            # For now, just note it
-            pass
+        # Unrealized P&L needs current market prices: see calculate_unrealized_pnl
         
         return {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": self._now_iso(),
             "open_positions": open_positions,
             "closed_trades": len(self.closed_trades),
             "total_pnl": self.metrics.total_p_l,
@@ -427,17 +698,27 @@ class PaperTradingEngine:
         """Display trading summary"""
         summary = self.get_portfolio_summary()
         
-        print(f"\n{'='*70}")
-        print(f"PORTFOLIO SUMMARY")
-        print(f"{'='*70}")
-        print(f"Open Positions: {summary['open_positions']}")
-        print(f"Closed Trades: {summary['closed_trades']}")
-        print(f"Total P&L: ${summary['total_pnl']:+.2f}")
-        print(f"Win Rate: {summary['win_rate']:.1f}%")
-        print(f"Winning Trades: {summary['winning_trades']} | Losing Trades: {summary['losing_trades']}")
-        print(f"Consecutive Losses: {summary['consecutive_losses']}/3")
-        print(f"Circuit Breaker: {'🔴 ACTIVE' if summary['circuit_breaker_active'] else '🟢 OFF'}")
-        print(f"{'='*70}\n")
+        print(
+            "%s\n"
+            "Open Positions: %d\n"
+            "Closed Trades: %d\n"
+            "Total P&L: $%+.2f\n"
+            "Win Rate: %.1f%%\n"
+            "Winning Trades: %d | Losing Trades: %d\n"
+            "Consecutive Losses: %d/3\n"
+            "Circuit Breaker: %s\n"
+            "%s\n" % (
+                _SUMMARY_HEADER,
+                summary["open_positions"],
+                summary["closed_trades"],
+                summary["total_pnl"],
+                summary["win_rate"],
+                summary["winning_trades"], summary["losing_trades"],
+                summary["consecutive_losses"],
+                "🔴 ACTIVE" if summary["circuit_breaker_active"] else "🟢 OFF",
+                _HR,
+            )
+        )
 
 
 def main():
@@ -445,6 +726,8 @@ def main():
     from polymarket_strategy import MeanReversionStrategy
     from polymarket_api import PolymarketAPI
     
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Load sample markets
     try:
         with open("sample_markets.json", "r") as f:
@@ -465,14 +748,13 @@ def main():
     
     print(strategy.format_signals_for_display(signals))
     
-    # Initialize trading engine
-    engine = PaperTradingEngine()
-    
-    # Process signals
-    engine.process_signals(signals, market_data)
-    
-    # Display summary
-    engine.display_summary()
+    # Initialize trading engine (closing it releases the trade log handle)
+    with PaperTradingEngine() as engine:
+        # Process signals
+        engine.process_signals(signals, market_data)
+        
+        # Display summary
+        engine.display_summary()
 
 
 if __name__ == "__main__":
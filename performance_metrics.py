@@ -5,13 +5,22 @@ Calculates comprehensive trading performance metrics
 
 import json
 import math
-from datetime import datetime
+import os
+import re
+import statistics
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, repeat
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 
 
-@dataclass
+# Month key (YYYY-MM) at the start of an ISO 8601 timestamp
+_MONTH_KEY_RE = re.compile(r"\d{4}-\d{2}")
+
+
+@dataclass(slots=True, frozen=True)
 class PerformanceMetrics:
     """Comprehensive performance metrics"""
     
@@ -61,6 +70,51 @@ class PerformanceMetrics:
         return asdict(self)
 
 
+class DrawdownTracker:
+    """Incremental maximum drawdown (from the all-time high) over an equity stream"""
+    
+    def __init__(self):
+        self.max_dd = 0.0  # Max drawdown %
+        self.max_dd_dollars = 0.0
+        self._peak: Optional[float] = None  # All-time high
+    
+    def update(self, equity: float):
+        """Add one equity sample"""
+        if self._peak is None or equity > self._peak:
+            self._peak = equity
+            return
+        peak = self._peak
+        
+        if peak > 0:
+            dd = (peak - equity) / peak * 100
+            if dd > self.max_dd:
+                self.max_dd = dd
+                self.max_dd_dollars = peak - equity
+    
+    def update_many(self, equity_values: List[float]):
+        """Add a batch of equity samples"""
+        # Same rules as update() with the peak in a local
+        if not equity_values:
+            return
+        peak = equity_values[0] if self._peak is None else self._peak
+        max_dd = self.max_dd
+        max_dd_dollars = self.max_dd_dollars
+        for equity in equity_values:
+            # A new peak has zero drawdown, so there is nothing else to check
+            if equity > peak:
+                peak = equity
+                continue
+            
+            if peak > 0:
+                dd = (peak - equity) / peak * 100
+                if dd > max_dd:
+                    max_dd = dd
+                    max_dd_dollars = peak - equity
+        self._peak = peak
+        self.max_dd = max_dd
+        self.max_dd_dollars = max_dd_dollars
+
+
 class PerformanceAnalyzer:
     """
     Analyzes trading performance and calculates metrics
@@ -86,6 +140,7 @@ class PerformanceAnalyzer:
         """
         self.initial_capital = initial_capital
         self.risk_free_rate = risk_free_rate
+        self._daily_rf_cache: Dict[Tuple[float, int], float] = {}
     
     def calculate_metrics(self,
                          equity_values: List[float],
@@ -115,36 +170,55 @@ class PerformanceAnalyzer:
         annualized_return = (((equity_values[-1] / self.initial_capital) ** (1 / years) - 1) 
                             * 100) if equity_values and years > 0 else 0
         
-        # Trade analysis
+        # Trade analysis: pull the numeric columns out of the trade dicts once;
+        # everything below works on plain lists
         closed_trades = [t for t in trades if t.get("status") == "closed"]
-        winning_trades = [t for t in closed_trades if t.get("p_l", 0) > 0]
-        losing_trades = [t for t in closed_trades if t.get("p_l", 0) <= 0]
+        pnl_values = [t.get("p_l", 0) for t in closed_trades]
+        durations = [t.get("days_held", 0) for t in closed_trades]
         
-        num_trades = len(closed_trades)
-        winning_count = len(winning_trades)
-        losing_count = len(losing_trades)
+        winning_pnls = [pnl for pnl in pnl_values if pnl > 0]
+        losing_pnls = [pnl for pnl in pnl_values if pnl <= 0]
+        winning_count = len(winning_pnls)
+        losing_count = len(losing_pnls)
+        # fsum: exact sums, so near-cancelling losses don't round to a spurious zero
+        # (total_pnl below uses fsum too, so it always equals their sum)
+        winning_pnl = math.fsum(winning_pnls)
+        losing_sum = math.fsum(losing_pnls)
+        
+        # Longest win / loss streaks
+        longest_win_streak = longest_loss_streak = 0
+        win_streak = loss_streak = 0
+        for pnl in pnl_values:
+            if pnl > 0:
+                win_streak += 1
+                loss_streak = 0
+                if win_streak > longest_win_streak:
+                    longest_win_streak = win_streak
+            else:
+                loss_streak += 1
+                win_streak = 0
+                if loss_streak > longest_loss_streak:
+                    longest_loss_streak = loss_streak
         
+        num_trades = len(closed_trades)
         win_rate = (winning_count / num_trades * 100) if num_trades > 0 else 0
         
         # P&L metrics
-        pnl_values = [t.get("p_l", 0) for t in closed_trades]
-        total_pnl = sum(pnl_values)
+        total_pnl = math.fsum(pnl_values)
         avg_trade_pnl = total_pnl / num_trades if num_trades > 0 else 0
-        median_trade_pnl = self._median(pnl_values)
+        median_trade_pnl = statistics.median(pnl_values) if pnl_values else 0.0
         
         best_trade = max(pnl_values) if pnl_values else 0
         worst_trade = min(pnl_values) if pnl_values else 0
         
         # Profit factor
-        winning_pnl = sum(t.get("p_l", 0) for t in winning_trades)
-        losing_pnl = abs(sum(t.get("p_l", 0) for t in losing_trades))
+        losing_pnl = abs(losing_sum)
         profit_factor = winning_pnl / losing_pnl if losing_pnl > 0 else 0
         
         # Risk metrics
         max_drawdown, max_drawdown_dollars = self._calculate_max_drawdown(equity_values)
         
         # Trade duration analysis
-        durations = [t.get("days_held", 0) for t in closed_trades]
         avg_trade_duration = sum(durations) / len(durations) if durations else 0
         best_trade_duration = max(durations) if durations else 0
         worst_trade_duration = min(durations) if durations else 0
@@ -156,15 +230,9 @@ class PerformanceAnalyzer:
         calmar_ratio = (annualized_return / abs(max_drawdown) 
                        if max_drawdown != 0 else 0)
         
-        # Win/Loss streaks
-        longest_win_streak = self._calculate_longest_streak(closed_trades, True)
-        longest_loss_streak = self._calculate_longest_streak(closed_trades, False)
-        
         # Win/Loss averages
-        avg_win = (sum(t.get("p_l", 0) for t in winning_trades) / 
-                  winning_count if winning_count > 0 else 0)
-        avg_loss = (sum(t.get("p_l", 0) for t in losing_trades) / 
-                   losing_count if losing_count > 0 else 0)
+        avg_win = winning_pnl / winning_count if winning_count > 0 else 0
+        avg_loss = losing_sum / losing_count if losing_count > 0 else 0
         
         win_loss_ratio = abs(avg_win / avg_loss) if avg_loss != 0 else 0
         
@@ -201,31 +269,14 @@ class PerformanceAnalyzer:
             expectancy=expectancy
         )
     
-    def _median(self, values: List[float]) -> float:
-        """Calculate median of a list"""
-        if not values:
-            return 0.0
-        
-        sorted_vals = sorted(values)
-        n = len(sorted_vals)
-        
-        if n % 2 == 0:
-            return (sorted_vals[n//2 - 1] + sorted_vals[n//2]) / 2
-        else:
-            return sorted_vals[n//2]
-    
     def _calculate_returns(self, equity_values: List[float]) -> List[float]:
         """Calculate daily returns from equity curve"""
         if len(equity_values) < 2:
             return []
         
-        returns = []
-        for i in range(1, len(equity_values)):
-            if equity_values[i-1] != 0:
-                ret = (equity_values[i] - equity_values[i-1]) / equity_values[i-1]
-                returns.append(ret)
-        
-        return returns
+        return [(curr - prev) / prev
+                for prev, curr in zip(equity_values, equity_values[1:])
+                if prev != 0]
     
     def _calculate_max_drawdown(self, equity_values: List[float]) -> Tuple[float, float]:
         """
@@ -234,25 +285,18 @@ class PerformanceAnalyzer:
         Returns:
             Tuple of (max_drawdown_percent, max_drawdown_dollars)
         """
-        if not equity_values:
-            return 0.0, 0.0
-        
-        max_equity = equity_values[0]
-        max_dd = 0.0
-        max_dd_dollars = 0.0
-        
-        for equity in equity_values:
-            if equity > max_equity:
-                max_equity = equity
-            
-            dd = (max_equity - equity) / max_equity * 100 if max_equity > 0 else 0
-            dd_dollars = max_equity - equity
-            
-            if dd > max_dd:
-                max_dd = dd
-                max_dd_dollars = dd_dollars
-        
-        return max_dd, max_dd_dollars
+        tracker = DrawdownTracker()
+        tracker.update_many(equity_values)
+        return tracker.max_dd, tracker.max_dd_dollars
+    
+    def _daily_rf(self, periods_per_year: int) -> float:
+        """Per-period risk-free rate, computed once per (rate, periods) pair"""
+        key = (self.risk_free_rate, periods_per_year)
+        rate = self._daily_rf_cache.get(key)
+        if rate is None:
+            rate = (1 + self.risk_free_rate) ** (1/periods_per_year) - 1
+            self._daily_rf_cache[key] = rate
+        return rate
     
     def _calculate_sharpe_ratio(self, returns: List[float], 
                                periods_per_year: int = 252) -> float:
@@ -269,15 +313,16 @@ class PerformanceAnalyzer:
         if not returns or len(returns) < 2:
             return 0.0
         
-        avg_return = sum(returns) / len(returns)
-        variance = sum((r - avg_return) ** 2 for r in returns) / len(returns)
+        n = len(returns)
+        avg_return = sum(returns) / n
+        variance = sum([(r - avg_return) ** 2 for r in returns]) / n
         std_dev = math.sqrt(variance)
         
         if std_dev == 0:
             return 0.0
         
         # Daily risk-free rate
-        daily_rf_rate = (1 + self.risk_free_rate) ** (1/periods_per_year) - 1
+        daily_rf_rate = self._daily_rf(periods_per_year)
         
         # Annualized Sharpe
         sharpe = (avg_return - daily_rf_rate) / std_dev * math.sqrt(periods_per_year)
@@ -302,51 +347,18 @@ class PerformanceAnalyzer:
         avg_return = sum(returns) / len(returns)
         
         # Downside volatility (only negative returns)
-        downside_returns = [r for r in returns if r < 0]
-        if downside_returns:
-            downside_variance = sum(r ** 2 for r in downside_returns) / len(returns)
-            downside_std = math.sqrt(downside_variance)
-        else:
-            downside_std = 0.0
+        downside_variance = sum([r ** 2 for r in returns if r < 0]) / len(returns)
+        downside_std = math.sqrt(downside_variance)
         
         if downside_std == 0:
             return 0.0
         
-        daily_rf_rate = (1 + self.risk_free_rate) ** (1/periods_per_year) - 1
+        daily_rf_rate = self._daily_rf(periods_per_year)
         
         sortino = (avg_return - daily_rf_rate) / downside_std * math.sqrt(periods_per_year)
         
         return sortino
     
-    def _calculate_longest_streak(self, trades: List[Dict], 
-                                 is_winning: bool = True) -> int:
-        """
-        Calculate longest win or loss streak
-        
-        Args:
-            trades: List of trade dicts
-            is_winning: True for win streak, False for loss streak
-            
-        Returns:
-            Length of longest streak
-        """
-        if not trades:
-            return 0
-        
-        max_streak = 0
-        current_streak = 0
-        
-        for trade in trades:
-            is_win = trade.get("p_l", 0) > 0
-            
-            if (is_winning and is_win) or (not is_winning and not is_win):
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 0
-        
-        return max_streak
-    
     def compare_with_benchmark(self,
                               equity_values: List[float],
                               benchmark_returns: List[float]) -> Dict:
@@ -402,11 +414,13 @@ class PerformanceAnalyzer:
         mean1 = sum(series1) / len(series1)
         mean2 = sum(series2) / len(series2)
         
-        cov = sum((series1[i] - mean1) * (series2[i] - mean2) 
-                 for i in range(len(series1))) / len(series1)
+        dev1 = [x - mean1 for x in series1]
+        dev2 = [x - mean2 for x in series2]
         
-        std1 = math.sqrt(sum((x - mean1) ** 2 for x in series1) / len(series1))
-        std2 = math.sqrt(sum((x - mean2) ** 2 for x in series2) / len(series2))
+        cov = sum([d1 * d2 for d1, d2 in zip(dev1, dev2)]) / min_len
+        
+        std1 = math.sqrt(sum([d ** 2 for d in dev1]) / min_len)
+        std2 = math.sqrt(sum([d ** 2 for d in dev2]) / min_len)
         
         if std1 * std2 == 0:
             return 0.0
@@ -426,34 +440,64 @@ class PerformanceAnalyzer:
         Returns:
             Dict of month -> return %
         """
+        # ISO 8601 timestamps start with YYYY-MM, so the month key is a slice.
+        # Samples are chronological, so each month is one contiguous run: only
+        # its first and last equity matter, and the dict is touched once per run.
         monthly_data = {}
-        
-        for i, timestamp in enumerate(timestamps):
-            dt = datetime.fromisoformat(timestamp)
-            month_key = dt.strftime("%Y-%m")
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    "start_equity": equity_values[i],
-                    "end_equity": equity_values[i]
-                }
+        for month_key, run in groupby(zip(timestamps, equity_values), key=lambda p: p[0][:7]):
+            if not _MONTH_KEY_RE.fullmatch(month_key):
+                continue  # Missing or malformed timestamps belong to no month
+            start = next(run)[1]
+            last = deque(run, maxlen=1)
+            end = last[0][1] if last else start
+            span = monthly_data.get(month_key)
+            if span is None:
+                monthly_data[month_key] = [start, end]  # [start, end]
             else:
-                monthly_data[month_key]["end_equity"] = equity_values[i]
+                span[1] = end  # Out-of-order sample: keep the month's first start
         
         monthly_returns = {}
-        for month, data in monthly_data.items():
-            start = data["start_equity"]
-            end = data["end_equity"]
-            ret = (end - start) / start * 100 if start > 0 else 0
-            monthly_returns[month] = ret
+        for month, (start, end) in monthly_data.items():
+            monthly_returns[month] = (end - start) / start * 100 if start > 0 else 0
         
         return monthly_returns
 
 
+# Total equity points + trades above which scenarios are analyzed in parallel
+PARALLEL_MIN_POINTS = 200_000
+
+
+def _analyze_scenario(scenario_data: Dict, analyzer: PerformanceAnalyzer) -> Dict:
+    """Metrics and monthly returns for one scenario (module-level so workers can pickle it)"""
+    state_history = scenario_data.get("state_history", [])
+    equity_values = [s.get("equity", 0) for s in state_history]
+    timestamps = [s.get("timestamp", "") for s in state_history]
+    trades = scenario_data.get("trades", [])
+    
+    # Calculate metrics
+    metrics = analyzer.calculate_metrics(
+        equity_values=equity_values,
+        trades=trades,
+        timestamps=timestamps,
+        num_days=30
+    )
+    
+    # Monthly returns
+    monthly_returns = analyzer.calculate_monthly_returns(timestamps, equity_values)
+    
+    return {
+        "metrics": metrics.to_dict(),
+        "monthly_returns": monthly_returns
+    }
+
+
 def analyze_backtest_results(results_file: str) -> Dict:
     """
     Analyze backtest results from JSON file
     
+    Scenarios are independent, so large result files are analyzed in
+    parallel worker processes (at most one per CPU); small ones in-process.
+    
     Args:
         results_file: Path to backtest results JSON
         
@@ -461,35 +505,28 @@ def analyze_backtest_results(results_file: str) -> Dict:
         Dict with analysis for all scenarios
     """
     
-    with open(results_file, "r") as f:
-        data = json.load(f)
+    with open(results_file, "rb") as f:
+        data = json.loads(f.read())
     
-    analysis = {}
+    scenarios = data.get("scenarios", {})
+    names = list(scenarios)
     
-    for scenario_name, scenario_data in data.get("scenarios", {}).items():
-        analyzer = PerformanceAnalyzer()
-        
-        equity_values = [s.get("equity", 0) for s in scenario_data.get("state_history", [])]
-        timestamps = [s.get("timestamp", "") for s in scenario_data.get("state_history", [])]
-        trades = scenario_data.get("trades", [])
-        
-        # Calculate metrics
-        metrics = analyzer.calculate_metrics(
-            equity_values=equity_values,
-            trades=trades,
-            timestamps=timestamps,
-            num_days=30
-        )
-        
-        # Monthly returns
-        monthly_returns = analyzer.calculate_monthly_returns(timestamps, equity_values)
-        
-        analysis[scenario_name] = {
-            "metrics": metrics.to_dict(),
-            "monthly_returns": monthly_returns
-        }
+    # One analyzer (and its caches) shared by every scenario
+    analyzer = PerformanceAnalyzer()
+    
+    # Each scenario costs a few operations per equity point and trade; below
+    # PARALLEL_MIN_POINTS in total, process startup and pickling outweigh it
+    total_points = sum(len(scenario.get("state_history", [])) + len(scenario.get("trades", []))
+                       for scenario in scenarios.values())
+    workers = min(len(names), os.cpu_count() or 1)
+    
+    if workers < 2 or total_points < PARALLEL_MIN_POINTS:
+        results = [_analyze_scenario(scenarios[name], analyzer) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_analyze_scenario, scenarios.values(), repeat(analyzer)))
     
-    return analysis
+    return dict(zip(names, results))
 
 
 def main():
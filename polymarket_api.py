@@ -2,33 +2,159 @@
 Polymarket API Module - Phase 1: Market Discovery
 Connects to Polymarket's gamma-api to discover active crypto prediction markets
 No authentication required (public data only)
-Uses built-in urllib to avoid external dependencies
+Uses built-in http.client (one keep-alive connection) to avoid external dependencies
 """
 
+import gzip
+import http.client
 import json
-import urllib.request
-import urllib.error
-from typing import List, Dict, Optional
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timezone
+from urllib.parse import urlsplit
 import ssl
 
+
+@lru_cache(maxsize=4096)
+def _parse_end_date(end_date_str) -> Optional[datetime]:
+    """Parse an API endDate; many markets share an expiry, so results are cached"""
+    try:
+        return datetime.fromisoformat(end_date_str.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 class PolymarketAPI:
     """Client for Polymarket API interactions"""
     
     BASE_URL = "https://gamma-api.polymarket.com"
     TIMEOUT = 10
+    CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "polymarket")
     
     # Crypto assets we're interested in
     CRYPTO_ASSETS = ["BTC", "ETH", "SOL"]
     # Market direction keywords
     DIRECTIONS = ["Up", "Down", "Higher", "Lower"]
     
-    def __init__(self, base_url: str = BASE_URL, timeout: int = TIMEOUT):
-        """Initialize Polymarket API client"""
+    # Keyword filters for is_crypto_market, matched against the upper-cased question
+    _CRYPTO_RE = re.compile("BTC|ETH|SOL|BITCOIN|ETHEREUM|SOLANA|CRYPTO")
+    _DIRECTION_RE = re.compile("UP|DOWN|HIGHER|LOWER|BREAK|ABOVE|BELOW|PRICE")
+    
+    def __init__(self, base_url: str = BASE_URL, timeout: int = TIMEOUT,
+                 use_cache: bool = False, cache_dir: str = CACHE_DIR):
+        """
+        Initialize Polymarket API client
+        
+        Args:
+            base_url: API root URL
+            timeout: Socket timeout in seconds
+            use_cache: Revalidate /markets against an on-disk copy (ETag / Last-Modified);
+                off by default so library use never writes to disk
+            cache_dir: Directory for the cached /markets responses
+        """
         self.base_url = base_url
         self.timeout = timeout
-        # Handle SSL for urllib
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
         self.context = ssl.create_default_context()
+        
+        # One keep-alive connection, reused across requests
+        parts = urlsplit(base_url)
+        self._scheme = parts.scheme
+        self._host = parts.netloc
+        self._path_prefix = parts.path.rstrip("/")
+        self._conn: Optional[http.client.HTTPConnection] = None
+    
+    def _connection(self) -> http.client.HTTPConnection:
+        """Return the open connection, creating it on first use"""
+        if self._conn is None:
+            if self._scheme == "https":
+                self._conn = http.client.HTTPSConnection(self._host, timeout=self.timeout,
+                                                         context=self.context)
+            else:
+                self._conn = http.client.HTTPConnection(self._host, timeout=self.timeout)
+        return self._conn
+    
+    def close(self):
+        """Close the keep-alive connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _get(self, path: str) -> bytes:
+        """GET a path on the API host and return the (decompressed) body"""
+        return self._send(path)[1]
+    
+    def _send(self, path: str, extra_headers: Optional[Dict[str, str]] = None
+              ) -> Tuple[http.client.HTTPResponse, bytes]:
+        """
+        GET a path on the API host
+        
+        A keep-alive connection the server has dropped is reopened once.
+        
+        Returns:
+            Tuple of (response, decompressed body)
+            
+        Raises:
+            OSError / http.client.HTTPException on network or HTTP errors
+        """
+        headers = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip"}
+        if extra_headers:
+            headers.update(extra_headers)
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.request("GET", self._path_prefix + path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Dropped keep-alive connection: worth one retry on a new one
+                self.close()
+                if attempt:
+                    raise
+            except (OSError, http.client.HTTPException):
+                # Timeouts and other failures are not retried
+                self.close()
+                raise
+        
+        if response.status >= 400:
+            raise http.client.HTTPException(f"HTTP {response.status} {response.reason}")
+        if response.getheader("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return response, body
+    
+    def _cache_file(self, limit: int) -> str:
+        """Cache path for one /markets query"""
+        host = re.sub(r"[^A-Za-z0-9.-]", "_", self._host)
+        return os.path.join(self.cache_dir, f"{host}_markets_{limit}.gz")
+    
+    @staticmethod
+    def _read_cache(path: str) -> Optional[Tuple[Dict[str, str], bytes]]:
+        """Return (validators, body) from a cache file, or None if unusable"""
+        try:
+            with gzip.open(path, "rb") as f:
+                header, _, body = f.read().partition(b"\n")
+            return json.loads(header), body
+        except (OSError, ValueError, EOFError):
+            return None
+    
+    @staticmethod
+    def _write_cache(path: str, validators: Dict[str, str], body: bytes):
+        """Store validators + body; cache failures never break a fetch"""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+                f.write(json.dumps(validators).encode("utf-8") + b"\n" + body)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
     
     def fetch_all_markets(self, limit: int = 1000) -> List[Dict]:
         """
@@ -41,24 +167,50 @@ class PolymarketAPI:
             List of market dictionaries
         """
         try:
-            url = f"{self.base_url}/markets?limit={limit}&active=true"
-            
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'Mozilla/5.0')
-            
-            with urllib.request.urlopen(req, context=self.context, timeout=self.timeout) as response:
-                data = json.loads(response.read().decode('utf-8'))
+            path = f"/markets?limit={limit}&active=true"
+            if self.use_cache:
+                data = json.loads(self._fetch_cached(path, self._cache_file(limit)))
+            else:
+                data = json.loads(self._get(path))
             
             markets = data if isinstance(data, list) else [data]
             return markets
         
-        except urllib.error.URLError as e:
+        except (OSError, http.client.HTTPException) as e:
             print(f"Error fetching markets: {e}")
             return []
         except json.JSONDecodeError as e:
             print(f"Error parsing markets JSON: {e}")
             return []
     
+    def _fetch_cached(self, path: str, cache_file: str) -> bytes:
+        """
+        GET a path, revalidating an on-disk copy
+        
+        Sends If-None-Match / If-Modified-Since from the cached copy; a 304
+        reuses the cached body, skipping the transfer.
+        """
+        cached = self._read_cache(cache_file)
+        conditional = {}
+        if cached:
+            validators = cached[0]
+            if validators.get("etag"):
+                conditional["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                conditional["If-Modified-Since"] = validators["last_modified"]
+        
+        response, body = self._send(path, conditional)
+        if response.status == 304 and cached:
+            return cached[1]
+        
+        validators = {
+            "etag": response.getheader("ETag"),
+            "last_modified": response.getheader("Last-Modified"),
+        }
+        if validators["etag"] or validators["last_modified"]:
+            self._write_cache(cache_file, validators, body)
+        return body
+    
     def is_crypto_market(self, market: Dict) -> bool:
         """
         Check if market is a crypto prediction market
@@ -71,20 +223,15 @@ class PolymarketAPI:
         """
         question = (market.get("question") or "").upper()
         
-        # Check for crypto mentions (BTC/ETH/SOL or bitcoin/ethereum/solana)
-        crypto_keywords = ["BTC", "ETH", "SOL", "BITCOIN", "ETHEREUM", "SOLANA", "CRYPTO"]
-        has_crypto = any(keyword in question for keyword in crypto_keywords)
-        
-        # Price direction/movement markets (Up, Down, Higher, Lower, Break, Price, Above, Below)
-        direction_keywords = ["UP", "DOWN", "HIGHER", "LOWER", "BREAK", "ABOVE", "BELOW", "PRICE"]
-        has_direction = any(keyword in question for keyword in direction_keywords)
+        # Crypto mention (BTC/ETH/SOL or bitcoin/ethereum/solana) and a price
+        # direction/movement word; substring matches, one C-level scan each
+        if not self._CRYPTO_RE.search(question) or not self._DIRECTION_RE.search(question):
+            return False
         
         # Include active markets (closed status doesn't matter as much if market had activity)
-        is_active = market.get("active", False)
-        has_volume = float(market.get("volumeNum", market.get("volume", 0))) > 0
-        
-        # Return markets that mention crypto, are price-based, and either active or have trading volume
-        return has_crypto and has_direction and (is_active or has_volume)
+        if market.get("active", False):
+            return True
+        return float(market.get("volumeNum", market.get("volume", 0))) > 0
     
     def parse_outcome_prices(self, prices_str) -> Dict[str, float]:
         """
@@ -113,12 +260,13 @@ class PolymarketAPI:
         except (json.JSONDecodeError, ValueError, TypeError):
             return {"YES": 0.0, "NO": 0.0}
     
-    def extract_market_data(self, market: Dict) -> Optional[Dict]:
+    def extract_market_data(self, market: Dict, now: Optional[datetime] = None) -> Optional[Dict]:
         """
         Extract relevant fields from market dictionary
         
         Args:
             market: Raw market data from API
+            now: Reference time for days_to_expiry (defaults to the current UTC time)
             
         Returns:
             Cleaned market data or None if invalid
@@ -134,15 +282,13 @@ class PolymarketAPI:
             
             # Parse expiration date
             end_date_str = market.get("endDate", "")
-            try:
-                end_date = datetime.fromisoformat(end_date_str.replace("Z", "+00:00"))
-            except:
-                end_date = None
+            end_date = _parse_end_date(end_date_str)
             
             # Calculate days until expiration
             days_to_expiry = None
             if end_date:
-                now = datetime.now(timezone.utc)
+                if now is None:
+                    now = datetime.now(timezone.utc)
                 delta = end_date - now
                 days_to_expiry = max(0, delta.days)
             
@@ -182,19 +328,22 @@ class PolymarketAPI:
         markets = self.fetch_all_markets(limit=limit)
         print(f"Fetched {len(markets)} total markets")
         
-        # Filter for crypto markets
-        crypto_markets = [m for m in markets if self.is_crypto_market(m)]
-        print(f"Found {len(crypto_markets)} crypto prediction markets")
-        
-        # Extract and format data
+        # Filter for crypto markets and extract their data in one pass
         formatted = []
-        for market in crypto_markets:
-            data = self.extract_market_data(market)
+        append = formatted.append
+        crypto_count = 0
+        now = datetime.now(timezone.utc)  # One reference time for the whole batch
+        for market in markets:
+            if not self.is_crypto_market(market):
+                continue
+            crypto_count += 1
+            data = self.extract_market_data(market, now)
             if data:
-                formatted.append(data)
+                append(data)
+        print(f"Found {crypto_count} crypto prediction markets")
         
         # Sort by volume (descending)
-        formatted.sort(key=lambda x: x["volume"], reverse=True)
+        formatted.sort(key=itemgetter("volume"), reverse=True)
         
         return formatted
     
@@ -209,16 +358,47 @@ class PolymarketAPI:
             Market data or None if not found
         """
         try:
-            url = f"{self.base_url}/markets/{market_id}"
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'Mozilla/5.0')
-            
-            with urllib.request.urlopen(req, context=self.context, timeout=self.timeout) as response:
-                return json.loads(response.read().decode('utf-8'))
-        except urllib.error.URLError as e:
+            return json.loads(self._get(f"/markets/{market_id}"))
+        except (OSError, http.client.HTTPException) as e:
             print(f"Error fetching market {market_id}: {e}")
             return None
     
+    def get_markets_bulk(self, market_ids: List[str], max_workers: int = 8) -> List[Optional[Dict]]:
+        """
+        Fetch several markets by ID concurrently
+        
+        Requests are latency-bound, so they are overlapped on a thread pool.
+        Each worker thread gets its own client (and keep-alive connection),
+        since one http.client connection cannot carry parallel requests.
+        
+        Args:
+            market_ids: Market IDs to fetch
+            max_workers: Maximum concurrent requests
+            
+        Returns:
+            Market data (or None if not found) in the order of market_ids
+        """
+        if not market_ids:
+            return []
+        
+        local = threading.local()
+        clients = []
+        
+        def fetch(market_id: str) -> Optional[Dict]:
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = PolymarketAPI(self.base_url, self.timeout,
+                                                      self.use_cache, self.cache_dir)
+                clients.append(client)
+            return client.get_market_by_id(market_id)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(market_ids))) as executor:
+                return list(executor.map(fetch, market_ids))
+        finally:
+            for client in clients:
+                client.close()
+    
     def export_to_json(self, markets: List[Dict], filepath: str = "sample_markets.json"):
         """
         Export market data to JSON file
@@ -233,8 +413,9 @@ class PolymarketAPI:
             "markets": markets
         }
         
+        # Compact separators keep json.dumps on its C encoder (indent= falls back to Python)
         with open(filepath, "w") as f:
-            json.dump(output, f, indent=2)
+            f.write(json.dumps(output, separators=(",", ":")))
         
         print(f"Exported {len(markets)} markets to {filepath}")
 
@@ -242,11 +423,14 @@ class PolymarketAPI:
 def main():
     """Main execution for market discovery"""
     
-    # Initialize API client
-    api = PolymarketAPI()
+    # Initialize API client; the CLI keeps an on-disk copy to revalidate against
+    api = PolymarketAPI(use_cache=True)
     
     # Discover crypto markets
-    markets = api.discover_crypto_markets(limit=2000)
+    try:
+        markets = api.discover_crypto_markets(limit=2000)
+    finally:
+        api.close()
     
     # Display summary
     print(f"\n{'='*60}")
@@ -4,21 +4,23 @@ Implements trading signals for crypto prediction markets based on mean-reversion
 """
 
 import json
+import re
+from collections import defaultdict, deque
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 
 
-class Signal(Enum):
-    """Trading signal types"""
+class Signal(str, Enum):
+    """Trading signal types (members compare and serialise as their string values)"""
     BUY = "BUY"
     SELL = "SELL"
     HOLD = "HOLD"
     NONE = "NONE"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StrategySignal:
     """Represents a trading signal from the strategy"""
     market_id: str
@@ -33,6 +35,23 @@ class StrategySignal:
     timestamp: str
     is_uptrend: bool
     recent_momentum: float  # Price change in recent period
+    
+    def to_dict(self) -> Dict:
+        """Convert to a JSON-serialisable dictionary"""
+        return {
+            "market_id": self.market_id,
+            "question": self.question,
+            "signal": Signal(self.signal).value,  # also accepts the plain string value
+            "current_price": self.current_price,
+            "entry_threshold": self.entry_threshold,
+            "exit_threshold": self.exit_threshold,
+            "position_size": self.position_size,
+            "confidence": self.confidence,
+            "reason": self.reason,
+            "timestamp": self.timestamp,
+            "is_uptrend": self.is_uptrend,
+            "recent_momentum": self.recent_momentum
+        }
 
 
 class MeanReversionStrategy:
@@ -56,10 +75,18 @@ class MeanReversionStrategy:
     MIN_VOLUME_FOR_TRADE = 1000  # Minimum volume to consider
     MIN_LIQUIDITY = 100          # Minimum liquidity
     
+    # Uptrend market keywords, matched anywhere in the upper-cased question
+    UPTREND_KEYWORDS = ("UP", "ABOVE", "BREAK", "HIGHER", "RISE", "INCREASE", "SURGE")
+    CRYPTO_KEYWORDS = ("BTC", "BITCOIN", "ETH", "ETHEREUM", "SOL", "SOLANA", "CRYPTO")
+    _UPTREND_RE = re.compile("|".join(UPTREND_KEYWORDS))
+    _CRYPTO_RE = re.compile("|".join(CRYPTO_KEYWORDS))
+    MAX_REJECTED = 10000  # Bound on remembered non-uptrend (market_id, question) pairs
+    
     def __init__(self):
         """Initialize strategy"""
         self.trade_history = []
-        self.market_history = {}  # Track recent prices for momentum
+        self.market_history = defaultdict(lambda: deque(maxlen=10))  # Recent prices for momentum
+        self._rejected = {}  # (market_id, question) pairs already classified as not uptrend
     
     def is_uptrend_market(self, market: Dict) -> bool:
         """
@@ -73,14 +100,10 @@ class MeanReversionStrategy:
         """
         question = (market.get("question") or "").upper()
         
-        # Keywords for uptrend markets
-        uptrend_keywords = ["UP", "ABOVE", "BREAK", "HIGHER", "RISE", "INCREASE", "SURGE"]
-        crypto_keywords = ["BTC", "BITCOIN", "ETH", "ETHEREUM", "SOL", "SOLANA", "CRYPTO"]
-        
-        has_uptrend = any(keyword in question for keyword in uptrend_keywords)
-        has_crypto = any(keyword in question for keyword in crypto_keywords)
-        
-        return has_uptrend and has_crypto
+        # Each pattern is one scan of the question instead of a loop of
+        # substring checks; keywords still match anywhere in a word
+        return (self._UPTREND_RE.search(question) is not None
+                and self._CRYPTO_RE.search(question) is not None)
     
     def calculate_momentum(self, market_id: str, current_price: float) -> float:
         """
@@ -93,26 +116,44 @@ class MeanReversionStrategy:
         Returns:
             Momentum factor (-1.0 to 1.0)
         """
-        if market_id not in self.market_history:
-            self.market_history[market_id] = []
-        
+        # Last 10 price observations; the deque drops the oldest itself
         history = self.market_history[market_id]
-        
-        # Keep last 10 price observations
-        history.append((datetime.now(timezone.utc), current_price))
-        if len(history) > 10:
-            history.pop(0)
+        history.append(current_price)
         
         # Calculate momentum
         if len(history) < 2:
             return 0.0
         
-        price_change = current_price - history[0][1]
+        price_change = current_price - history[0]
         # Normalize to -1.0 to 1.0 range (price can be 0 to 1)
         momentum = max(-1.0, min(1.0, price_change * 2))
         
         return momentum
     
+    def _entry_checks(self, market: Dict) -> Tuple[bool, bool, bool, bool]:
+        """
+        The entry checks: price below threshold, sufficient volume, sufficient
+        liquidity and at least 1 day to expiry. A BUY needs all of them.
+        """
+        return (
+            market.get("yes_price", 0.5) < self.BUY_THRESHOLD,
+            market.get("volume", 0) >= self.MIN_VOLUME_FOR_TRADE,
+            market.get("liquidity", 0) >= self.MIN_LIQUIDITY,
+            market.get("days_to_expiry", 0) >= 1,
+        )
+    
+    def _exit_checks(self, market: Dict) -> Tuple[bool, bool]:
+        """The exit checks: price above threshold, at least half a day left"""
+        return (
+            market.get("yes_price", 0.5) > self.SELL_THRESHOLD,
+            market.get("days_to_expiry", 0) >= 0.5,
+        )
+    
+    @staticmethod
+    def _exit_triggered(above_threshold: bool, tradeable: bool) -> bool:
+        """Exit when the profit target is hit or the market is expiring"""
+        return above_threshold or not tradeable
+    
     def evaluate_entry(self, market: Dict) -> Tuple[bool, float, str]:
         """
         Evaluate if we should enter a position (BUY YES)
@@ -127,34 +168,33 @@ class MeanReversionStrategy:
         volume = market.get("volume", 0)
         liquidity = market.get("liquidity", 0)
         
+        days_to_expiry = market.get("days_to_expiry", 0)
+        checks = self._entry_checks(market)
+        below_threshold, has_volume, has_liquidity, not_expiring = checks
+        
         reasons = []
         
         # Check 1: Price below buy threshold
-        below_threshold = yes_price < self.BUY_THRESHOLD
         if below_threshold:
             reasons.append(f"price {yes_price:.2%} below threshold {self.BUY_THRESHOLD:.2%}")
         
         # Check 2: Sufficient volume
-        has_volume = volume >= self.MIN_VOLUME_FOR_TRADE
         if has_volume:
             reasons.append(f"volume ${volume:,.0f} sufficient")
         
         # Check 3: Sufficient liquidity
-        has_liquidity = liquidity >= self.MIN_LIQUIDITY
         if has_liquidity:
             reasons.append(f"liquidity ${liquidity:,.0f} sufficient")
         
         # Check 4: Not about to expire (at least 1 day left)
-        days_to_expiry = market.get("days_to_expiry", 0)
-        not_expiring = days_to_expiry >= 1
         if not_expiring:
             reasons.append(f"{days_to_expiry} days to expiry")
         
         # Confidence = how many checks pass
-        checks_passed = sum([below_threshold, has_volume, has_liquidity, not_expiring])
+        checks_passed = below_threshold + has_volume + has_liquidity + not_expiring
         confidence = checks_passed / 4.0
         
-        should_buy = below_threshold and has_volume and has_liquidity and not_expiring
+        should_buy = all(checks)
         
         reason = " | ".join(reasons) if reasons else "conditions not met"
         
@@ -172,11 +212,12 @@ class MeanReversionStrategy:
             Tuple of (should_sell, confidence, reason)
         """
         yes_price = market.get("yes_price", 0.5)
+        days_to_expiry = market.get("days_to_expiry", 0)
+        above_threshold, tradeable = self._exit_checks(market)
         
         reasons = []
         
         # Check 1: Price above sell threshold
-        above_threshold = yes_price > self.SELL_THRESHOLD
         if above_threshold:
             reasons.append(f"price {yes_price:.2%} above threshold {self.SELL_THRESHOLD:.2%}")
         
@@ -186,105 +227,120 @@ class MeanReversionStrategy:
         if profitable:
             reasons.append(f"profitable (+{profit_pct:.1f}%)")
         
-        # Check 3: Not expiring soon (still tradeable)
-        days_to_expiry = market.get("days_to_expiry", 0)
-        tradeable = days_to_expiry >= 0.5  # At least half a day left
+        # Check 3: Not expiring soon (at least half a day left, still tradeable)
         if tradeable:
             reasons.append(f"{days_to_expiry:.1f} days left")
         
         # Confidence = how many checks pass
-        checks_passed = sum([above_threshold, profitable, tradeable])
+        checks_passed = above_threshold + profitable + tradeable
         confidence = checks_passed / 3.0
         
         # Exit conditions: either hit profit target or expiring
-        should_sell = above_threshold or (not tradeable)
+        should_sell = self._exit_triggered(above_threshold, tradeable)
         
         reason = " | ".join(reasons) if reasons else "hold"
         
         return should_sell, confidence, reason
     
-    def generate_signal(self, market: Dict) -> Optional[StrategySignal]:
+    def generate_signal(self, market: Dict, timestamp: Optional[str] = None) -> Optional[StrategySignal]:
         """
         Generate trading signal for a market
         
         Args:
             market: Market data from API
+            timestamp: ISO timestamp for the signal (defaults to now)
             
         Returns:
             StrategySignal or None if not tradeable
         """
-        # Filter: Only process "Up" crypto markets
-        if not self.is_uptrend_market(market):
-            return None
-        
-        market_id = market.get("market_id")
-        question = market.get("question", "")
-        yes_price = market.get("yes_price", 0.5)
-        
-        # Calculate momentum
-        momentum = self.calculate_momentum(market_id, yes_price)
-        
-        # Determine signal
-        signal = Signal.NONE
-        entry_threshold = self.BUY_THRESHOLD
-        exit_threshold = self.SELL_THRESHOLD
-        confidence = 0.0
-        reason = ""
-        
-        # Check for entry signal
-        should_buy, buy_confidence, buy_reason = self.evaluate_entry(market)
-        if should_buy:
-            signal = Signal.BUY
-            confidence = buy_confidence
-            reason = buy_reason
-        else:
-            # Check for exit signal (would apply to existing positions)
-            should_sell, sell_confidence, sell_reason = self.evaluate_exit(
-                market, 
-                self.BUY_THRESHOLD  # Assume we bought near threshold
-            )
-            if should_sell:
-                signal = Signal.SELL
-                confidence = sell_confidence
-                reason = sell_reason
-        
-        if signal == Signal.NONE:
-            return None
-        
+        signals = self.generate_signals([market], timestamp)
+        return signals[0] if signals else None
+    
+    def _make_signal(self, market: Dict, signal: Signal, confidence: float,
+                     reason: str, momentum: float, timestamp: str) -> StrategySignal:
+        """Build a StrategySignal for an uptrend market"""
         return StrategySignal(
-            market_id=market_id,
-            question=question,
+            market_id=market.get("market_id"),
+            question=market.get("question", ""),
             signal=signal,
-            current_price=yes_price,
-            entry_threshold=entry_threshold,
-            exit_threshold=exit_threshold,
+            current_price=market.get("yes_price", 0.5),
+            entry_threshold=self.BUY_THRESHOLD,
+            exit_threshold=self.SELL_THRESHOLD,
             position_size=self.MAX_POSITION_SIZE,
             confidence=confidence,
             reason=reason,
-            timestamp=datetime.now(timezone.utc).isoformat(),
+            timestamp=timestamp,
             is_uptrend=True,
             recent_momentum=momentum
         )
     
-    def generate_signals(self, markets: List[Dict]) -> List[StrategySignal]:
+    def generate_signals(self, markets: List[Dict], timestamp: Optional[str] = None) -> List[StrategySignal]:
         """
         Generate trading signals for multiple markets
         
+        A market gets a BUY signal when evaluate_entry accepts it, else a
+        SELL signal when evaluate_exit does (as for a position bought near
+        BUY_THRESHOLD). The same checks are first run as plain comparisons,
+        so evaluate_entry/evaluate_exit only build reason strings for
+        markets that can actually produce a signal.
+        
         Args:
             markets: List of market data from API
+            timestamp: ISO timestamp for the signals (defaults to now)
             
         Returns:
             List of StrategySignal objects
         """
-        signals = []
-        
+        # Markets that failed the uptrend check are skipped on later scans
+        # while their question is unchanged (the check only reads the question)
+        rejected = self._rejected
+        candidates = []
         for market in markets:
-            signal = self.generate_signal(market)
-            if signal:
-                signals.append(signal)
+            key = (market.get("market_id"), market.get("question"))
+            if key in rejected:
+                continue
+            if self.is_uptrend_market(market):
+                candidates.append(market)
+            else:
+                rejected[key] = None
+                if len(rejected) > self.MAX_REJECTED:
+                    # Insertion order: drop the oldest entry
+                    del rejected[next(iter(rejected))]
+        
+        # Momentum history is updated for every uptrend market, signal or not
+        momenta = [
+            self.calculate_momentum(market.get("market_id"), market.get("yes_price", 0.5))
+            for market in candidates
+        ]
+        
+        # One clock read for the whole batch
+        timestamp = timestamp or datetime.now(timezone.utc).isoformat()
+        signals = []
+        for market, momentum in zip(candidates, momenta):
+            if all(self._entry_checks(market)):
+                should_buy, confidence, reason = self.evaluate_entry(market)
+                if should_buy:
+                    signals.append(self._make_signal(market, Signal.BUY, confidence, reason,
+                                                     momentum, timestamp))
+                    continue
+            if self._exit_triggered(*self._exit_checks(market)):
+                should_sell, confidence, reason = self.evaluate_exit(market, self.BUY_THRESHOLD)
+                if should_sell:
+                    signals.append(self._make_signal(market, Signal.SELL, confidence, reason,
+                                                     momentum, timestamp))
         
         return signals
     
+    @staticmethod
+    def _signal_block(signal: StrategySignal, threshold: float) -> str:
+        """Display lines for one signal, priced against the given threshold"""
+        return (
+            f"  • {signal.question}\n"
+            f"    Price: {signal.current_price:.2%} (threshold: {threshold:.2%})\n"
+            f"    Size: ${signal.position_size:.2f} | Confidence: {signal.confidence:.0%}\n"
+            f"    Reason: {signal.reason}"
+        )
+    
     def format_signals_for_display(self, signals: List[StrategySignal]) -> str:
         """
         Format signals for display
@@ -302,28 +358,51 @@ class MeanReversionStrategy:
         output.append(f"STRATEGY SIGNALS - {len(signals)} signal(s) generated")
         output.append(f"{'='*70}")
         
-        buy_signals = [s for s in signals if s.signal == Signal.BUY]
-        sell_signals = [s for s in signals if s.signal == Signal.SELL]
+        # Partition in a single pass over the signals
+        buy_signals, sell_signals = [], []
+        for signal in signals:
+            if signal.signal == Signal.BUY:
+                buy_signals.append(signal)
+            elif signal.signal == Signal.SELL:
+                sell_signals.append(signal)
         
+        # One formatted block per signal, joined once at the end
         if buy_signals:
             output.append(f"\n📈 BUY SIGNALS ({len(buy_signals)}):")
-            for signal in buy_signals:
-                output.append(f"  • {signal.question}")
-                output.append(f"    Price: {signal.current_price:.2%} (threshold: {signal.entry_threshold:.2%})")
-                output.append(f"    Size: ${signal.position_size:.2f} | Confidence: {signal.confidence:.0%}")
-                output.append(f"    Reason: {signal.reason}")
+            output.extend(self._signal_block(signal, signal.entry_threshold) for signal in buy_signals)
         
         if sell_signals:
             output.append(f"\n📉 SELL SIGNALS ({len(sell_signals)}):")
-            for signal in sell_signals:
-                output.append(f"  • {signal.question}")
-                output.append(f"    Price: {signal.current_price:.2%} (threshold: {signal.exit_threshold:.2%})")
-                output.append(f"    Size: ${signal.position_size:.2f} | Confidence: {signal.confidence:.0%}")
-                output.append(f"    Reason: {signal.reason}")
+            output.extend(self._signal_block(signal, signal.exit_threshold) for signal in sell_signals)
         
         output.append(f"{'='*70}\n")
         
         return "\n".join(output)
+    
+    def export_signals(self, signals: List[StrategySignal], filepath: str = "signals.json"):
+        """
+        Export signals to a JSON file
+        
+        Signals are encoded and written one at a time, so no list of signal
+        dicts (or single document string) is held in memory; the file is the
+        same {"timestamp", "count", "signals": [...]} document.
+        
+        Args:
+            signals: List of strategy signals
+            filepath: Output file path
+        """
+        dumps = json.dumps
+        with open(filepath, "w") as f:
+            # Compact separators keep json on its C encoder (indent forces the Python one)
+            f.write(f'{{"timestamp":{dumps(datetime.now(timezone.utc).isoformat())},'
+                    f'"count":{len(signals)},"signals":[')
+            for i, signal in enumerate(signals):
+                if i:
+                    f.write(",")
+                f.write(dumps(signal.to_dict(), separators=(",", ":")))
+            f.write("]}")
+        
+        print(f"Signals saved to {filepath}")
 
 
 def main():
@@ -350,15 +429,7 @@ def main():
     
     # Save signals to file
     if signals:
-        signals_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "count": len(signals),
-            "signals": [asdict(s) for s in signals]
-        }
-        with open("signals.json", "w") as f:
-            json.dump(signals_data, f, indent=2)
-        print(f"Signals saved to signals.json")
-
+        strategy.export_signals(signals)
 
 if __name__ == "__main__":
     main()
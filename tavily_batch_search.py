@@ -2,70 +2,247 @@
 """
 Tavily Batch Search - Rate Limit Workaround
 Batch multiple searches with intelligent delays
+
+Searches POST straight to the Tavily REST API over one keep-alive HTTPS
+connection; results are formatted the same way as the tavily-search skill's
+search.mjs.
 """
 
-import subprocess
+import http.client
 import json
+import threading
 import time
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
 TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')
-TAVILY_SCRIPT = "/data/.openclaw/workspace/skills/tavily-search/scripts/search.mjs"
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+REQUEST_TIMEOUT = 30  # seconds
+
+# Rate limiting: no fixed spacing by default; pacing follows the API's
+# X-RateLimit-* headers and 429 Retry-After responses
+MIN_DELAY_BETWEEN_REQUESTS = 0  # seconds between request starts
+MAX_RETRIES = 3  # retries of a search answered with 429
+MAX_BACKOFF = 60  # seconds
+BATCH_WORKERS = 4  # concurrent searches in batch_search
 
-# Rate limiting
-MIN_DELAY_BETWEEN_REQUESTS = 2  # seconds
-BATCH_DELAY = 5  # seconds between batches
+# Successful results are reused for identical searches within this window
+CACHE_TTL = 600  # seconds
+CACHE_MAX = 256  # entries
 
 class TavilyBatchSearch:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, search_url: str = TAVILY_SEARCH_URL,
+                 timeout: int = REQUEST_TIMEOUT):
         self.api_key = api_key
+        self.search_url = search_url
+        self.timeout = timeout
         self.last_request_time = 0
+        self.resume_at = 0  # time.monotonic() before which no request starts (quota exhausted)
         self.request_count = 0
         self.batch_count = 0
+        # Guards the rate-limit slot and request counter across batch workers
+        self._lock = threading.Lock()
+        # (query, num_results, deep) -> (expires_at, result), oldest first;
+        # written under _lock
+        self._cache: Dict[tuple, tuple] = {}
+        
+        # One keep-alive connection, reused across searches
+        parts = urlsplit(search_url)
+        self._scheme = parts.scheme
+        self._host = parts.netloc
+        self._path = parts.path or "/"
+        self._conn: Optional[http.client.HTTPConnection] = None
+    
+    def _connection(self) -> http.client.HTTPConnection:
+        """Return the open connection, creating it on first use"""
+        if self._conn is None:
+            if self._scheme == "https":
+                self._conn = http.client.HTTPSConnection(self._host, timeout=self.timeout)
+            else:
+                self._conn = http.client.HTTPConnection(self._host, timeout=self.timeout)
+        return self._conn
+    
+    def close(self):
+        """Close the keep-alive connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _post(self, payload: Dict) -> Tuple[http.client.HTTPResponse, bytes]:
+        """
+        POST a search request
+        
+        A keep-alive connection the server has dropped is reopened once.
+        
+        Returns:
+            Tuple of (response, body); HTTP error statuses are left to the caller
+            
+        Raises:
+            OSError / http.client.HTTPException on network errors
+        """
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.request("POST", self._path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if attempt:
+                    raise
+        return response, data
+    
+    @staticmethod
+    def _format_results(data: Dict, num_results: int) -> str:
+        """Render a search response as markdown, matching search.mjs output"""
+        lines = []
+        if data.get("answer"):
+            lines += ["## Answer", "", data["answer"], "", "---", ""]
+        lines += ["## Sources", ""]
+        
+        for r in (data.get("results") or [])[:num_results]:
+            title = str(r.get("title") or "").strip()
+            url = str(r.get("url") or "").strip()
+            content = str(r.get("content") or "").strip()
+            score = f" (relevance: {r['score'] * 100:.0f}%)" if r.get("score") else ""
+            
+            if not title or not url:
+                continue
+            lines.append(f"- **{title}**{score}")
+            lines.append(f"  {url}")
+            if content:
+                lines.append(f"  {content[:300]}{'...' if len(content) > 300 else ''}")
+            lines.append("")
+        
+        return "\n".join(lines) + "\n"
     
     def _wait_for_rate_limit(self):
-        """Enforce minimum delay between requests"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < MIN_DELAY_BETWEEN_REQUESTS:
-            wait_time = MIN_DELAY_BETWEEN_REQUESTS - elapsed
+        """
+        Enforce minimum delay between request starts
+        
+        Each caller reserves the next free start slot under the lock and then
+        sleeps outside it, so concurrent batch workers are paced as one stream.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.last_request_time + MIN_DELAY_BETWEEN_REQUESTS, self.resume_at)
+            self.last_request_time = start
+        if start > now:
+            wait_time = start - now
             print(f"⏳ Rate limit: waiting {wait_time:.1f}s...")
             time.sleep(wait_time)
     
-    def search(self, query: str, num_results: int = 5, deep: bool = False) -> Dict:
-        """Search a single query"""
-        self._wait_for_rate_limit()
+    @staticmethod
+    def _header_seconds(value: Optional[str]) -> Optional[float]:
+        """Parse a seconds-valued rate-limit header (a delay or a Unix time) into a delay"""
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            return None
+        # Large values are absolute reset times rather than delays
+        return seconds - time.time() if seconds > 1e9 else seconds
+    
+    def _apply_rate_limit_headers(self, response: http.client.HTTPResponse, attempt: int):
+        """
+        Hold back further requests when the API says the quota is spent
         
-        cmd = [
-            "node", TAVILY_SCRIPT, query,
-            "-n", str(num_results)
-        ]
+        A 429 waits for Retry-After (or an exponential backoff when it is
+        missing); otherwise requests only pause once X-RateLimit-Remaining
+        reaches 1, until X-RateLimit-Reset.
+        """
+        if response.status == 429:
+            delay = self._header_seconds(response.getheader("Retry-After"))
+            if delay is None:
+                delay = min(MAX_BACKOFF, 2 ** attempt)
+        else:
+            try:
+                remaining = int(response.getheader("X-RateLimit-Remaining"))
+            except (TypeError, ValueError):
+                return
+            if remaining > 1:
+                return
+            delay = self._header_seconds(response.getheader("X-RateLimit-Reset"))
+            if delay is None:
+                delay = 1
         
-        if deep:
-            cmd.append("--deep")
+        with self._lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + min(MAX_BACKOFF, delay))
+    
+    def _cached(self, key: tuple) -> Optional[Dict]:
+        """Return a copy of a still-fresh cached result, or None"""
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1])
+        return None
+    
+    def _store(self, key: tuple, result: Dict):
+        """Cache a result, evicting expired entries and keeping the cache bounded"""
+        with self._lock:
+            cache = self._cache
+            now = time.monotonic()
+            cache.pop(key, None)  # Re-insert at the end (newest)
+            # Entries share one TTL, so insertion order is expiry order
+            while cache:
+                oldest = next(iter(cache))
+                if cache[oldest][0] > now and len(cache) < CACHE_MAX:
+                    break
+                del cache[oldest]
+            cache[key] = (now + CACHE_TTL, result)
+    
+    def search(self, query: str, num_results: int = 5, deep: bool = False) -> Dict:
+        """Search a single query (repeats within CACHE_TTL are served from memory)"""
+        cached = self._cached((query, num_results, deep))
+        if cached is not None:
+            return cached
+        return self._run_search(self, query, num_results, deep)
+    
+    def _run_search(self, client: "TavilyBatchSearch", query: str,
+                    num_results: int, deep: bool) -> Dict:
+        """
+        POST one search over client's connection and build its result dict
         
-        env = os.environ.copy()
-        env['TAVILY_API_KEY'] = self.api_key
+        Waits for the rate limiter first, and retries up to MAX_RETRIES times
+        when the API answers 429.
+        """
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "search_depth": "advanced" if deep else "basic",
+            "topic": "general",
+            "max_results": max(1, min(num_results, 20)),
+            "include_answer": True,
+            "include_raw_content": False,
+        }
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, env=env)
-            self.last_request_time = time.time()
-            self.request_count += 1
+            for attempt in range(MAX_RETRIES + 1):
+                self._wait_for_rate_limit()
+                response, body = client._post(payload)
+                self._apply_rate_limit_headers(response, attempt)
+                if response.status != 429:
+                    break
             
-            if result.returncode == 0:
-                return {
-                    "query": query,
-                    "success": True,
-                    "result": result.stdout,
-                    "request_num": self.request_count
-                }
-            else:
-                return {
-                    "query": query,
-                    "success": False,
-                    "error": result.stderr,
-                    "request_num": self.request_count
-                }
+            if response.status >= 400:
+                text = body.decode("utf-8", "replace")
+                raise http.client.HTTPException(f"Tavily Search failed ({response.status}): {text}")
+            data = json.loads(body)
+            with self._lock:
+                self.request_count += 1
+                request_num = self.request_count
+            
+            result = {
+                "query": query,
+                "success": True,
+                "result": self._format_results(data, num_results),
+                "request_num": request_num
+            }
+            self._store((query, num_results, deep), result)
+            return dict(result)
         except Exception as e:
             return {
                 "query": query,
@@ -74,24 +251,50 @@ class TavilyBatchSearch:
                 "request_num": self.request_count
             }
     
-    def batch_search(self, queries: List[str], num_results: int = 5) -> List[Dict]:
-        """Search multiple queries with rate limiting"""
-        results = []
+    def batch_search(self, queries: List[str], num_results: int = 5,
+                     max_workers: int = BATCH_WORKERS) -> List[Dict]:
+        """
+        Search multiple queries with rate limiting
         
-        for i, query in enumerate(queries, 1):
+        Up to max_workers searches are in flight at once, paced as one stream
+        by the shared rate limiter, so a slow response no longer holds back
+        the next query. Each worker thread gets its own connection, since one
+        http.client connection cannot carry parallel requests.
+        
+        Returns:
+            Result dicts in the order of queries
+        """
+        if not queries:
+            return []
+        
+        self.batch_count += 1
+        local = threading.local()
+        clients = []
+        
+        def run(indexed_query) -> Dict:
+            i, query = indexed_query
+            cached = self._cached((query, num_results, False))
+            if cached is not None:
+                return cached
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = TavilyBatchSearch(self.api_key, self.search_url, self.timeout)
+                clients.append(client)
             print(f"\n🔍 [{i}/{len(queries)}] Searching: {query}")
-            result = self.search(query, num_results)
-            results.append(result)
-            
-            if result["success"]:
-                print(f"✅ Success (request #{result['request_num']})")
-            else:
-                print(f"❌ Failed: {result['error']}")
-            
-            # Delay between batches
-            if i < len(queries):
-                print(f"⏳ Batch delay: {BATCH_DELAY}s...")
-                time.sleep(BATCH_DELAY)
+            return self._run_search(client, query, num_results, False)
+        
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+                for result in executor.map(run, enumerate(queries, 1)):
+                    results.append(result)
+                    if result["success"]:
+                        print(f"✅ Success (request #{result['request_num']})")
+                    else:
+                        print(f"❌ Failed: {result['error']}")
+        finally:
+            for client in clients:
+                client.close()
         
         return results
 
@@ -103,6 +306,7 @@ if __name__ == "__main__":
         exit(1)
     
     search = TavilyBatchSearch(TAVILY_API_KEY)
+    started = time.monotonic()
     
     # Batch search example
     queries = [
@@ -114,9 +318,10 @@ if __name__ == "__main__":
     print("🚀 Starting batch search with rate limiting...")
     print(f"Queries: {len(queries)}")
     print(f"Min delay: {MIN_DELAY_BETWEEN_REQUESTS}s between requests")
-    print(f"Batch delay: {BATCH_DELAY}s between batches\n")
+    print(f"Concurrent searches: {BATCH_WORKERS}\n")
     
     results = search.batch_search(queries, num_results=3)
+    search.close()
     
     # Summary
     print("\n" + "="*60)
@@ -126,4 +331,4 @@ if __name__ == "__main__":
     print(f"Total queries: {len(queries)}")
     print(f"Successful: {successful}/{len(queries)}")
     print(f"Total requests: {search.request_count}")
-    print(f"Time elapsed: ~{MIN_DELAY_BETWEEN_REQUESTS * len(queries) + BATCH_DELAY * (len(queries)-1):.0f}s")
+    print(f"Time elapsed: {time.monotonic() - started:.0f}s")
@@ -0,0 +1,95 @@
+"""
+Test Script for BetSystem Core: Risk Controls
+Checks the RiskManager limits at and around their boundaries
+"""
+
+from betsystem_core import RiskManager, User
+
+
+def make_user(daily_loss_limit=100.0):
+    """Test user with a $1000 bankroll"""
+    return User(
+        id="test_user",
+        email="test@example.com",
+        bankroll=1000.0,
+        max_stake_percent=5.0,
+        daily_loss_limit=daily_loss_limit
+    )
+
+
+def test_daily_loss_limit():
+    """Test 1: Daily loss limit boundary"""
+    print("\n" + "="*70)
+    print("TEST 1: DAILY LOSS LIMIT")
+    print("="*70)
+    
+    user = make_user(daily_loss_limit=100.0)
+    
+    # losses_today -> expected result (trading allowed up to the limit itself)
+    cases = {0.0: True, 99.99: True, 100.0: True, 100.01: False, 250.0: False}
+    
+    passed = True
+    for losses_today, expected in cases.items():
+        allowed = RiskManager.check_daily_limit(user, losses_today)
+        ok = allowed == expected
+        passed = passed and ok
+        print(f"   Losses ${losses_today:.2f}: {'allowed' if allowed else 'blocked'} "
+              f"{'✅' if ok else '❌'}")
+    
+    return passed
+
+
+def test_stake_validation():
+    """Test 2: Stake cap for single stakes and stake sequences"""
+    print("\n" + "="*70)
+    print("TEST 2: STAKE VALIDATION")
+    print("="*70)
+    
+    # 5% of $1000: stakes up to $50 are allowed
+    single = [RiskManager.validate_stake(s, 1000.0, 5.0) for s in (49.99, 50.0, 50.01)]
+    mask = RiskManager.validate_stake([49.99, 50.0, 50.01], 1000.0, 5.0)
+    
+    print(f"\n   Single stakes: {single}")
+    print(f"   Stake mask:    {mask}")
+    
+    return single == [True, True, False] and mask == single
+
+
+def print_test_summary(results):
+    """Print summary of test results"""
+    print("\n" + "="*70)
+    print("TEST SUMMARY")
+    print("="*70)
+    
+    test_names = [
+        "Daily Loss Limit",
+        "Stake Validation"
+    ]
+    
+    for i, (name, passed) in enumerate(zip(test_names, results)):
+        status = "✅ PASS" if passed else "❌ FAIL"
+        print(f"{i+1}. {name}: {status}")
+    
+    total_passed = sum(results)
+    total_tests = len(results)
+    print(f"\nTotal: {total_passed}/{total_tests} tests passed")
+    
+    return all(results)
+
+
+def main():
+    """Run all tests"""
+    print("\n" + "="*70)
+    print("BETSYSTEM CORE TEST SUITE: RISK CONTROLS")
+    print("="*70)
+    
+    results = [
+        test_daily_loss_limit(),
+        test_stake_validation()
+    ]
+    
+    print_test_summary(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,22 +4,92 @@ Demonstrates the complete trading system with sample data and simulated market s
 """
 
 import json
+import logging
 import os
-from copy import deepcopy
+import tempfile
 from datetime import datetime, timezone
-from polymarket_strategy import MeanReversionStrategy, Signal
-from paper_trading import PaperTradingEngine
+from polymarket_strategy import MeanReversionStrategy, Signal, StrategySignal
+from paper_trading import PaperTradingEngine, TradeMetrics
+
+
+# Sample markets are read once and shared by every test (treat them as read-only;
+# use simulate_market_prices to get modified copies)
+_MARKETS = None
+_MARKET_BY_ID = None
 
 
 def load_sample_markets():
     """Load sample market data"""
-    try:
-        with open("sample_markets.json", "r") as f:
-            data = json.load(f)
-            return data.get("markets", [])
-    except FileNotFoundError:
-        print("❌ sample_markets.json not found. Run polymarket_api.py first.")
-        return []
+    global _MARKETS, _MARKET_BY_ID
+    if _MARKETS is None:
+        try:
+            with open("sample_markets.json", "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print("❌ sample_markets.json not found. Run polymarket_api.py first.")
+            return []
+        _MARKETS = data.get("markets", [])
+        _MARKET_BY_ID = {m["market_id"]: m for m in _MARKETS}
+    return _MARKETS
+
+
+def load_market_data():
+    """Sample markets keyed by market_id"""
+    load_sample_markets()
+    return _MARKET_BY_ID or {}
+
+
+def remove_state_files():
+    """Delete the engine's state files left by a previous test"""
+    for f in ["positions.json", "trades.json", "trades.jsonl"]:
+        try:
+            os.remove(f)
+        except FileNotFoundError:
+            pass
+
+
+# Engine of the running test; the next new_engine() call closes it
+_ENGINE = None
+
+
+def new_engine():
+    """Fresh PaperTradingEngine on the default files, closing the previous test's engine"""
+    global _ENGINE
+    close_engine()
+    _ENGINE = PaperTradingEngine()
+    return _ENGINE
+
+
+def close_engine():
+    """Close the trade log handle of the last engine from new_engine()"""
+    global _ENGINE
+    if _ENGINE is not None:
+        _ENGINE.close()
+        _ENGINE = None
+
+
+def temp_engine(directory):
+    """PaperTradingEngine whose state files live in directory"""
+    return PaperTradingEngine(positions_file=os.path.join(directory, "positions.json"),
+                              trades_file=os.path.join(directory, "trades.json"))
+
+
+def make_signal(market_id, kind, price):
+    """$10 StrategySignal of the given kind at price"""
+    return StrategySignal(
+        market_id=market_id,
+        question=f"Will {market_id} go up?",
+        signal=kind,
+        current_price=price,
+        entry_threshold=0.40,
+        exit_threshold=0.60,
+        position_size=10.0,
+        confidence=0.8,
+        reason="Test signal",
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        is_uptrend=True,
+        recent_momentum=0.0
+    )
 
 
 def simulate_market_prices(markets, price_changes):
@@ -31,21 +101,23 @@ def simulate_market_prices(markets, price_changes):
         price_changes: Dict of market_id -> price change (0.0 to 1.0)
         
     Returns:
-        Modified market data with new prices
+        Market data with new prices; only the changed markets are copies, the
+        others are the original (shared) dicts
     """
     updated_markets = []
     
     for market in markets:
-        market_copy = deepcopy(market)
-        market_id = market.get("market_id")
-        
-        if market_id in price_changes:
-            # Apply price change
-            new_price = market_copy.get("yes_price", 0.5) + price_changes[market_id]
-            # Clamp to 0.0 to 1.0
-            new_price = max(0.0, min(1.0, new_price))
-            market_copy["yes_price"] = new_price
+        change = price_changes.get(market.get("market_id"))
+        if change is None:
+            updated_markets.append(market)
+            continue
         
+        # Market dicts hold only scalars and only yes_price is changed,
+        # so a shallow copy is enough
+        market_copy = dict(market)
+        # Apply price change, clamped to 0.0 to 1.0
+        new_price = market_copy.get("yes_price", 0.5) + change
+        market_copy["yes_price"] = max(0.0, min(1.0, new_price))
         updated_markets.append(market_copy)
     
     return updated_markets
@@ -94,11 +166,9 @@ def test_position_management():
     print("="*70)
     
     # Clean up existing data
-    for f in ["positions.json", "trades.json"]:
-        if os.path.exists(f):
-            os.remove(f)
+    remove_state_files()
     
-    engine = PaperTradingEngine()
+    engine = new_engine()
     
     # Create a test signal
     from polymarket_strategy import StrategySignal
@@ -146,11 +216,9 @@ def test_pnl_calculation():
     print("="*70)
     
     # Clean up
-    for f in ["positions.json", "trades.json"]:
-        if os.path.exists(f):
-            os.remove(f)
+    remove_state_files()
     
-    engine = PaperTradingEngine()
+    engine = new_engine()
     
     # Create and open a position
     from polymarket_strategy import StrategySignal
@@ -209,11 +277,9 @@ def test_circuit_breaker():
     print("="*70)
     
     # Clean up
-    for f in ["positions.json", "trades.json"]:
-        if os.path.exists(f):
-            os.remove(f)
+    remove_state_files()
     
-    engine = PaperTradingEngine()
+    engine = new_engine()
     
     from polymarket_strategy import StrategySignal
     
@@ -240,22 +306,24 @@ def test_circuit_breaker():
     # Simulate 3 losing trades, then 1 winning trade
     results = [False, False, False, True, True]  # Outcomes
     
-    for i, signal in enumerate(test_signals):
-        # Open position
-        position = engine.open_position(signal)
-        if not position:
-            continue
+    # Snapshot files are written once after the loop, not after every trade
+    with engine.deferred_saves():
+        for i, signal in enumerate(test_signals):
+            # Open position
+            position = engine.open_position(signal)
+            if not position:
+                continue
         
-        # Close position with simulated result
-        exit_price = 0.30 if not results[i] else 0.70  # Loss or Win
-        trade = engine.close_position(position.position_id, exit_price, "Test close")
+            # Close position with simulated result
+            exit_price = 0.30 if not results[i] else 0.70  # Loss or Win
+            trade = engine.close_position(position.position_id, exit_price, "Test close")
         
-        if trade:
-            outcome = "✅ WIN" if trade.p_l > 0 else "❌ LOSS"
-            print(f"   Trade {i+1}: {outcome} (P&L: ${trade.p_l:+.2f})")
+            if trade:
+                outcome = "✅ WIN" if trade.p_l > 0 else "❌ LOSS"
+                print(f"   Trade {i+1}: {outcome} (P&L: ${trade.p_l:+.2f})")
             
-            if i == 3:  # After 3 losses, check circuit breaker
-                print(f"   → Circuit Breaker Status: {'🔴 ACTIVE' if engine.circuit_breaker_active else '🟢 OFF'}")
+                if i == 3:  # After 3 losses, check circuit breaker
+                    print(f"   → Circuit Breaker Status: {'🔴 ACTIVE' if engine.circuit_breaker_active else '🟢 OFF'}")
     
     print(f"\n✅ Circuit breaker logic verified")
     print(f"   Final Status: {'🔴 ACTIVE (trading stopped)' if engine.circuit_breaker_active else '🟢 OFF'}")
@@ -311,14 +379,14 @@ def test_idempotency():
             trades_before = data.get("count", 0)
     
     # Run engine again with same data
-    engine = PaperTradingEngine()
+    engine = new_engine()
     markets = load_sample_markets()
     
     if markets:
         strategy = MeanReversionStrategy()
         signals = strategy.generate_signals(markets)
         
-        market_data = {m["market_id"]: m for m in markets}
+        market_data = load_market_data()
         engine.process_signals(signals, market_data)
     
     # Count trades after
@@ -376,6 +444,122 @@ def test_json_export():
     return True
 
 
+def test_replay():
+    """Test 8: In-memory replay matches process_signals"""
+    print("\n" + "="*70)
+    print("TEST 8: REPLAY")
+    print("="*70)
+    
+    def market(price, days_to_expiry=10.0):
+        return {"yes_price": price, "days_to_expiry": days_to_expiry}
+    
+    # Three strategy exits at a loss trip the circuit breaker, so the BUY on f
+    # is skipped; d leaves on the profit target and e on expiry
+    rounds = [
+        ([make_signal(m, Signal.BUY, p) for m, p in
+          [("a", 0.50), ("b", 0.50), ("c", 0.50), ("d", 0.35), ("e", 0.35)]],
+         {m: market(p) for m, p in [("a", 0.50), ("b", 0.50), ("c", 0.50), ("d", 0.35), ("e", 0.35)]}),
+        ([make_signal(m, Signal.SELL, 0.30) for m in ("a", "b", "c")],
+         {"d": market(0.75), "e": market(0.40)}),
+        ([make_signal("f", Signal.BUY, 0.35)],
+         {"e": market(0.40, days_to_expiry=0.05), "f": market(0.35)}),
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        with temp_engine(directory) as engine:
+            for signals, market_data in rounds:
+                engine.process_signals(signals, market_data)
+            expected = engine.metrics.to_dict()
+            open_after = len(engine.positions)
+    
+    replayed = PaperTradingEngine.replay(rounds).to_dict()
+    
+    print(f"\n   Engine trades: {expected['total_trades']} (P&L ${expected['total_p_l']:+.2f})")
+    print(f"   Replay trades: {replayed['total_trades']} (P&L ${replayed['total_p_l']:+.2f})")
+    
+    return replayed == expected and expected["total_trades"] == 5 and open_after == 0
+
+
+def test_deferred_saves():
+    """Test 9: Snapshot writes are deferred to the end of a batch"""
+    print("\n" + "="*70)
+    print("TEST 9: DEFERRED SAVES")
+    print("="*70)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        trades_file = os.path.join(directory, "trades.json")
+        with temp_engine(directory) as engine:
+            with engine.deferred_saves():
+                with engine.deferred_saves():
+                    for i in range(3):
+                        position = engine.open_position(make_signal(f"m{i}", Signal.BUY, 0.35))
+                        engine.close_position(position.position_id, 0.65, "Test close")
+                # The inner block leaves the write to the outer one
+                written_in_batch = os.path.exists(trades_file)
+            
+            with open(trades_file, "rb") as f:
+                count = json.loads(f.read())["count"]
+    
+    print(f"\n   Snapshot written inside the batch: {written_in_batch}")
+    print(f"   Trades in snapshot after the batch: {count}")
+    
+    return not written_in_batch and count == 3
+
+
+def test_trade_log_migration():
+    """Test 10: Full legacy trades.json is migrated to the JSONL log, a snapshot is not"""
+    print("\n" + "="*70)
+    print("TEST 10: TRADE LOG MIGRATION")
+    print("="*70)
+    
+    def closed_trade(i, p_l):
+        return {"trade_id": f"trade_m{i}_{i}", "market_id": f"m{i}", "question": "Test market",
+                "entry_time": "2026-01-01T00:00:00+00:00", "entry_price": 0.35,
+                "exit_time": "2026-01-02T00:00:00+00:00", "exit_price": 0.65,
+                "quantity": 10.0, "p_l": p_l, "p_l_percent": p_l * 10, "signal": "Test trade",
+                "exit_reason": "Test close"}
+    
+    trades = [closed_trade(i, p_l) for i, p_l in enumerate([5.0, -2.0, 3.0])]
+    metrics = {"total_trades": 3, "winning_trades": 2, "losing_trades": 1, "total_p_l": 6.0}
+    
+    results = {}
+    # A legacy file holds every trade; a snapshot of 12 trades holds only the last ones
+    for name, count in [("legacy", 3), ("snapshot", 12)]:
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "trades.json"), "w") as f:
+                json.dump({"count": count, "trades": trades,
+                           "metrics": dict(metrics, total_trades=count)}, f)
+            with temp_engine(directory) as engine:
+                results[name] = (len(engine.closed_trades),
+                                 os.path.exists(os.path.join(directory, "trades.jsonl")),
+                                 engine.metrics.total_trades,
+                                 engine.metrics.avg_win)
+        print(f"   {name}: {results[name][0]} trade(s) loaded, log created: {results[name][1]}")
+    
+    return (results["legacy"] == (3, True, 3, 4.0)
+            and results["snapshot"][:3] == (0, False, 12))
+
+
+def test_metrics_round_trip():
+    """Test 11: TradeMetrics survive a to_dict/from_dict round trip"""
+    print("\n" + "="*70)
+    print("TEST 11: METRICS ROUND TRIP")
+    print("="*70)
+    
+    metrics = TradeMetrics()
+    for p_l in [5.0, -1.0, -2.0, -3.0, 4.0]:
+        metrics.record(p_l)
+    
+    restored = TradeMetrics.from_dict(metrics.to_dict())
+    # Older snapshots carry no P&L sums: they default to zero
+    legacy = TradeMetrics.from_dict({"total_trades": 2, "winning_trades": 1, "losing_trades": 1})
+    
+    print(f"\n   Restored: {restored.to_dict()}")
+    
+    return (restored == metrics
+            and legacy.total_trades == 2 and legacy.winning_p_l == 0.0 and legacy.avg_win == 0.0)
+
+
 def print_test_summary(results):
     """Print summary of test results"""
     print("\n" + "="*70)
@@ -389,7 +573,11 @@ def print_test_summary(results):
         "Circuit Breaker",
         "Metrics Calculation",
         "Idempotency",
-        "JSON Export"
+        "JSON Export",
+        "Replay",
+        "Deferred Saves",
+        "Trade Log Migration",
+        "Metrics Round Trip"
     ]
     
     for i, (name, passed) in enumerate(zip(test_names, results)):
@@ -405,6 +593,8 @@ def print_test_summary(results):
 
 def main():
     """Run all tests"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("\n" + "="*70)
     print("PHASE 2 TEST SUITE: STRATEGY & PAPER TRADING ENGINE")
     print("="*70)
@@ -419,8 +609,13 @@ def main():
         test_circuit_breaker(),
         test_metrics_calculation(),
         test_idempotency(),
-        test_json_export()
+        test_json_export(),
+        test_replay(),
+        test_deferred_saves(),
+        test_trade_log_migration(),
+        test_metrics_round_trip()
     ]
+    close_engine()
     
     # Print summary
     print_test_summary(results)
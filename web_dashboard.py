@@ -5,11 +5,14 @@ Flask app for real-time portfolio monitoring
 Access via: http://your-server:5000
 """
 
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, Response, request
+import hashlib
 import json
 import os
 import statistics
-from datetime import datetime
+import threading
+from functools import lru_cache
+from itertools import islice
 
 app = Flask(__name__)
 
@@ -18,73 +21,123 @@ POSITION_FILE = "/root/polymarket_trading/positions.json"
 TRADES_FILE = "/root/polymarket_trading/trades.json"
 EQUITY_FILE = "/root/polymarket_trading/equity_live.json"
 
+@lru_cache(maxsize=8)
+def _parse_json(path, mtime_ns):
+    """Parse a JSON file; keyed on mtime so a rewrite invalidates the entry"""
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+def _load_json(path):
+    return _parse_json(path, os.stat(path).st_mtime_ns)
+
+# Missing, unreadable (OSError) or malformed (ValueError, which covers JSON
+# and UTF-8 decode errors) files fall back to empty defaults
 def load_positions():
-    if os.path.exists(POSITION_FILE):
-        try:
-            with open(POSITION_FILE) as f:
-                return json.load(f)
-        except:
-            pass
-    return {"positions": [], "cash": 100.0, "equity": 100.0, "max_drawdown": 0.0, "consecutive_losses": 0}
+    try:
+        return _load_json(POSITION_FILE)
+    except (OSError, ValueError):
+        return {"positions": [], "cash": 100.0, "equity": 100.0, "max_drawdown": 0.0, "consecutive_losses": 0}
 
 def load_trades():
-    if os.path.exists(TRADES_FILE):
-        try:
-            with open(TRADES_FILE) as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-        except:
-            pass
-    return []
+    try:
+        data = _load_json(TRADES_FILE)
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
 
 def load_equity_history():
-    if os.path.exists(EQUITY_FILE):
-        try:
-            with open(EQUITY_FILE) as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-        except:
-            pass
-    return []
+    try:
+        data = _load_json(EQUITY_FILE)
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+def _equity_metrics(equities):
+    """
+    Max drawdown (from the first point) and annualised Sharpe ratio of an
+    equity curve, gathered in a single pass over the points
+    """
+    start = prev = equities[0]
+    max_drawdown = 0.0
+    returns = []
+    for equity in islice(equities, 1, None):
+        drawdown = (start - equity) / start
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+        returns.append((equity - prev) / prev)
+        prev = equity
+    
+    # stdev needs at least two returns, i.e. three equity points
+    if len(returns) < 2:
+        return max_drawdown, 0.0
+    stdev = statistics.stdev(returns)
+    sharpe_ratio = (statistics.mean(returns) * 252) / (stdev * (252**0.5)) if stdev > 0 else 0.0
+    return max_drawdown, sharpe_ratio
 
 def calculate_metrics(trades, equity_history):
-    sells = [t for t in trades if t["type"] == "SELL"]
-    if not sells:
+    # Counts and sums of the closed (SELL) trades, gathered in one pass
+    total_trades = winning_trades = losing_trades = 0
+    total_pnl = gross_profit = sum_losses = 0
+    for t in trades:
+        if t["type"] != "SELL":
+            continue
+        pnl = t["realized_pnl"]
+        total_trades += 1
+        total_pnl += pnl
+        if pnl > 0:
+            winning_trades += 1
+            gross_profit += pnl
+        else:
+            losing_trades += 1
+            sum_losses += pnl
+    
+    if not total_trades:
         return {
             "total_trades": 0, "winning_trades": 0, "losing_trades": 0,
             "win_rate": 0.0, "total_pnl": 0.0, "avg_win": 0.0, "avg_loss": 0.0,
             "profit_factor": 0.0, "max_drawdown": 0.0, "sharpe_ratio": 0.0
         }
     
-    wins = [t["realized_pnl"] for t in sells if t["realized_pnl"] > 0]
-    losses = [t["realized_pnl"] for t in sells if t["realized_pnl"] <= 0]
-    
-    total_pnl = sum(t["realized_pnl"] for t in sells)
-    win_rate = len(wins) / len(sells) if sells else 0
-    avg_win = statistics.mean(wins) if wins else 0
-    avg_loss = statistics.mean(losses) if losses else 0
-    gross_profit = sum(wins) if wins else 0
-    gross_loss = abs(sum(losses)) if losses else 0
+    win_rate = winning_trades / total_trades
+    avg_win = gross_profit / winning_trades if winning_trades else 0
+    avg_loss = sum_losses / losing_trades if losing_trades else 0
+    gross_loss = abs(sum_losses)
     profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
     
     if equity_history:
-        equities = [e["equity"] for e in equity_history]
-        max_drawdown = max([(equities[0] - e) / equities[0] for e in equities] + [0])
-        if len(equities) > 1:
-            returns = [(equities[i+1] - equities[i]) / equities[i] for i in range(len(equities)-1)]
-            sharpe_ratio = (statistics.mean(returns) * 252) / (statistics.stdev(returns) * (252**0.5)) if returns and statistics.stdev(returns) > 0 else 0.0
-        else:
-            sharpe_ratio = 0.0
+        max_drawdown, sharpe_ratio = _equity_metrics([e["equity"] for e in equity_history])
     else:
         max_drawdown, sharpe_ratio = 0.0, 0.0
     
     return {
-        "total_trades": len(sells), "winning_trades": len(wins), "losing_trades": len(losses),
+        "total_trades": total_trades, "winning_trades": winning_trades, "losing_trades": losing_trades,
         "win_rate": win_rate, "total_pnl": total_pnl, "avg_win": avg_win, "avg_loss": avg_loss,
         "profit_factor": profit_factor, "max_drawdown": max_drawdown, "sharpe_ratio": sharpe_ratio
     }
 
-HTML_TEMPLATE = """
+def _file_version(path):
+    """(mtime, size) of a file, or None if it cannot be stat'ed"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+# Metrics keyed on the trade and equity files' versions, so positions-only
+# updates reuse them. Only used while holding _snapshot_lock.
+_metrics_cache = (None, None)
+
+def _cached_metrics(key, trades, equity_history):
+    global _metrics_cache
+    cached_key, metrics = _metrics_cache
+    if cached_key != key:
+        metrics = calculate_metrics(trades, equity_history)
+        _metrics_cache = (key, metrics)
+    return metrics
+
+# Static page shell: the browser fetches /api/data and fills it in, so the
+# server never renders HTML per request
+INDEX_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -127,30 +180,30 @@ HTML_TEMPLATE = """
             <p>Real-time portfolio monitoring • Auto-refresh every 5s</p>
         </div>
         
-        <button class="refresh-btn" onclick="location.reload()">🔄 Refresh Now</button>
+        <button class="refresh-btn" onclick="refresh()">🔄 Refresh Now</button>
         
         <!-- Portfolio Stats -->
         <div class="grid">
             <div class="card">
                 <h2>💰 Bankroll</h2>
-                <div class="value">${{ portfolio.cash|round(2) }}</div>
+                <div class="value" id="cash">-</div>
                 <div class="label">Available Cash</div>
             </div>
             <div class="card">
                 <h2>📈 Total Equity</h2>
-                <div class="value">${{ portfolio.equity|round(2) }}</div>
+                <div class="value" id="equity">-</div>
                 <div class="label">Current Portfolio Value</div>
             </div>
             <div class="card">
                 <h2>💹 P&L</h2>
-                <div class="value {% if pnl_value >= 0 %}positive{% else %}negative{% endif %}">
-                    ${{ (portfolio.equity - 100)|round(2) }}<br>
-                    <span class="label" style="color: inherit;">{{ pnl_pct|round(2) }}%</span>
+                <div class="value" id="pnl-card">
+                    <span id="pnl">-</span><br>
+                    <span class="label" style="color: inherit;" id="pnl-pct">-</span>
                 </div>
             </div>
             <div class="card">
                 <h2>📉 Max Drawdown</h2>
-                <div class="value negative">{{ (portfolio.max_drawdown * 100)|round(2) }}%</div>
+                <div class="value negative" id="max-drawdown">-</div>
                 <div class="label">Largest Loss from Peak</div>
             </div>
         </div>
@@ -165,154 +218,258 @@ HTML_TEMPLATE = """
                 </tr>
                 <tr>
                     <td>Total Trades</td>
-                    <td><strong>{{ metrics.total_trades }}</strong></td>
+                    <td><strong id="total-trades">-</strong></td>
                 </tr>
                 <tr>
                     <td>Winning Trades</td>
-                    <td><span class="positive">{{ metrics.winning_trades }}</span></td>
+                    <td><span class="positive" id="winning-trades">-</span></td>
                 </tr>
                 <tr>
                     <td>Losing Trades</td>
-                    <td><span class="negative">{{ metrics.losing_trades }}</span></td>
+                    <td><span class="negative" id="losing-trades">-</span></td>
                 </tr>
                 <tr>
                     <td>Win Rate</td>
-                    <td><strong>{{ (metrics.win_rate * 100)|round(1) }}%</strong></td>
+                    <td><strong id="win-rate">-</strong></td>
                 </tr>
                 <tr>
                     <td>Average Win</td>
-                    <td><span class="positive">${{ metrics.avg_win|round(2) }}</span></td>
+                    <td><span class="positive" id="avg-win">-</span></td>
                 </tr>
                 <tr>
                     <td>Average Loss</td>
-                    <td><span class="negative">${{ metrics.avg_loss|round(2) }}</span></td>
+                    <td><span class="negative" id="avg-loss">-</span></td>
                 </tr>
                 <tr>
                     <td>Profit Factor</td>
-                    <td><strong>{{ metrics.profit_factor|round(2) }}x</strong></td>
+                    <td><strong id="profit-factor">-</strong></td>
                 </tr>
                 <tr>
                     <td>Sharpe Ratio</td>
-                    <td><strong>{{ metrics.sharpe_ratio|round(2) }}</strong></td>
+                    <td><strong id="sharpe-ratio">-</strong></td>
                 </tr>
             </table>
         </div>
         
         <!-- Open Positions -->
-        {% if positions.positions %}
-        <div class="table-container">
-            <h2 style="margin-bottom: 15px;">🔓 Open Positions ({{ positions.positions|length }})</h2>
+        <div class="table-container" id="positions-section" hidden>
+            <h2 style="margin-bottom: 15px;">🔓 Open Positions (<span id="positions-count">0</span>)</h2>
             <table class="table">
-                <tr>
-                    <th>Market</th>
-                    <th>Entry Price</th>
-                    <th>Current Price</th>
-                    <th>P&L</th>
-                    <th>Strategy</th>
-                </tr>
-                {% for pos in positions.positions %}
-                <tr>
-                    <td>{{ pos.market_question[:40] }}</td>
-                    <td>${{ pos.entry_price|round(3) }}</td>
-                    <td>${{ pos.current_price|round(3) }}</td>
-                    <td>
-                        <span class="{% if pos.unrealized_pnl >= 0 %}positive{% else %}negative{% endif %}">
-                            ${{ pos.unrealized_pnl|round(2) }} ({{ (pos.unrealized_pnl_pct * 100)|round(2) }}%)
-                        </span>
-                    </td>
-                    <td><span class="badge {% if pos.strategy == 'mean_reversion' %}mean-reversion{% else %}reversal{% endif %}">{{ pos.strategy }}</span></td>
-                </tr>
-                {% endfor %}
+                <thead>
+                    <tr>
+                        <th>Market</th>
+                        <th>Entry Price</th>
+                        <th>Current Price</th>
+                        <th>P&L</th>
+                        <th>Strategy</th>
+                    </tr>
+                </thead>
+                <tbody id="positions-body"></tbody>
             </table>
         </div>
-        {% endif %}
         
         <!-- Recent Trades -->
-        {% if trades %}
-        <div class="table-container">
+        <div class="table-container" id="trades-section" hidden>
             <h2 style="margin-bottom: 15px;">💬 Recent Trades (Last 10)</h2>
             <table class="table">
-                <tr>
-                    <th>Time</th>
-                    <th>Type</th>
-                    <th>Market</th>
-                    <th>Price</th>
-                    <th>P&L</th>
-                    <th>Strategy</th>
-                </tr>
-                {% for trade in trades[-10:]|reverse %}
-                <tr>
-                    <td class="time">{{ trade.timestamp.split('T')[1][:5] }}</td>
-                    <td><span class="badge {% if trade.type == 'BUY' %}buy{% else %}sell{% endif %}">{{ trade.type }}</span></td>
-                    <td>{{ trade.market[:35] }}</td>
-                    <td>${{ trade.price|round(3) }}</td>
-                    <td>
-                        {% if trade.type == 'SELL' %}
-                        <span class="{% if trade.realized_pnl >= 0 %}positive{% else %}negative{% endif %}">
-                            ${{ trade.realized_pnl|round(2) }}
-                        </span>
-                        {% else %}
-                        -
-                        {% endif %}
-                    </td>
-                    <td>{{ trade.get('strategy', 'N/A') }}</td>
-                </tr>
-                {% endfor %}
+                <thead>
+                    <tr>
+                        <th>Time</th>
+                        <th>Type</th>
+                        <th>Market</th>
+                        <th>Price</th>
+                        <th>P&L</th>
+                        <th>Strategy</th>
+                    </tr>
+                </thead>
+                <tbody id="trades-body"></tbody>
             </table>
         </div>
-        {% endif %}
         
         <div style="text-align: center; margin-top: 40px; color: #64748b; font-size: 12px;">
-            <p>Last updated: {{ now }}</p>
+            <p>Last updated: <span id="updated">-</span></p>
             <p>Page auto-refreshes every 5 seconds</p>
         </div>
     </div>
     
     <script>
-        // Auto-refresh every 5 seconds
-        setTimeout(() => location.reload(), 5000);
+        const RECENT_TRADES = 10;  // Only the newest trades are shown (and fetched)
+        const num = (v, digits) => Number(v || 0).toFixed(digits);
+        const money = (v, digits = 2) => "$" + num(v, digits);
+        const signClass = v => (v || 0) >= 0 ? "positive" : "negative";
+        const setText = (id, text) => { document.getElementById(id).textContent = text; };
+        
+        function addCell(row, text, className) {
+            const span = document.createElement("span");
+            span.textContent = text;
+            if (className) span.className = className;
+            row.insertCell().appendChild(span);
+        }
+        
+        function render(data) {
+            const portfolio = data.portfolio, metrics = data.metrics;
+            const equity = portfolio.equity ?? 100;
+            const pnl = equity - 100;
+            
+            setText("cash", money(portfolio.cash));
+            setText("equity", money(portfolio.equity));
+            setText("pnl", money(pnl));
+            setText("pnl-pct", num(pnl, 2) + "%");
+            document.getElementById("pnl-card").className = "value " + signClass(pnl);
+            setText("max-drawdown", num((portfolio.max_drawdown || 0) * 100, 2) + "%");
+            
+            setText("total-trades", metrics.total_trades);
+            setText("winning-trades", metrics.winning_trades);
+            setText("losing-trades", metrics.losing_trades);
+            setText("win-rate", num(metrics.win_rate * 100, 1) + "%");
+            setText("avg-win", money(metrics.avg_win));
+            setText("avg-loss", money(metrics.avg_loss));
+            setText("profit-factor", num(metrics.profit_factor, 2) + "x");
+            setText("sharpe-ratio", num(metrics.sharpe_ratio, 2));
+            
+            const positions = portfolio.positions || [];
+            document.getElementById("positions-section").hidden = positions.length === 0;
+            setText("positions-count", positions.length);
+            const positionsBody = document.getElementById("positions-body");
+            positionsBody.replaceChildren();
+            for (const pos of positions) {
+                const row = positionsBody.insertRow();
+                addCell(row, String(pos.market_question || "").slice(0, 40));
+                addCell(row, money(pos.entry_price, 3));
+                addCell(row, money(pos.current_price, 3));
+                addCell(row, `${money(pos.unrealized_pnl)} (${num((pos.unrealized_pnl_pct || 0) * 100, 2)}%)`,
+                        signClass(pos.unrealized_pnl));
+                addCell(row, pos.strategy,
+                        "badge " + (pos.strategy === "mean_reversion" ? "mean-reversion" : "reversal"));
+            }
+            
+            const trades = data.trades || [];
+            document.getElementById("trades-section").hidden = trades.length === 0;
+            const tradesBody = document.getElementById("trades-body");
+            tradesBody.replaceChildren();
+            for (const trade of trades.slice(-RECENT_TRADES).reverse()) {
+                const row = tradesBody.insertRow();
+                addCell(row, String(trade.timestamp || "").split("T")[1]?.slice(0, 5) ?? "", "time");
+                addCell(row, trade.type, "badge " + (trade.type === "BUY" ? "buy" : "sell"));
+                addCell(row, String(trade.market || "").slice(0, 35));
+                addCell(row, money(trade.price, 3));
+                if (trade.type === "SELL") {
+                    addCell(row, money(trade.realized_pnl), signClass(trade.realized_pnl));
+                } else {
+                    addCell(row, "-");
+                }
+                addCell(row, trade.strategy ?? "N/A");
+            }
+            
+            setText("updated", new Date().toLocaleString());
+        }
+        
+        async function refresh() {
+            try {
+                const response = await fetch("/api/data?limit=" + RECENT_TRADES);
+                if (response.ok) render(await response.json());
+            } catch (err) {
+                console.error("Dashboard refresh failed", err);
+            }
+        }
+        
+        // Poll the JSON endpoint instead of reloading the whole page
+        refresh();
+        setInterval(refresh, 5000);
     </script>
 </body>
 </html>
 """
 
+INDEX_ETAG = '"%s"' % hashlib.sha1(INDEX_HTML.encode()).hexdigest()
+
+def _data_etag():
+    """Weak ETag for /api/data, built from the data files' (mtime, size)"""
+    versions = []
+    for path in (POSITION_FILE, TRADES_FILE, EQUITY_FILE):
+        version = _file_version(path)
+        versions.append("%d.%d" % version if version else "0")
+    return 'W/"%s"' % "-".join(versions)
+
+def _not_modified(etag, cache_control):
+    """304 response when the client already holds this version, else None"""
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+    return None
+
 @app.route('/')
 def dashboard():
-    positions = load_positions()
-    trades = load_trades()
-    equity_history = load_equity_history()
-    metrics = calculate_metrics(trades, equity_history)
-    
-    pnl_value = positions.get('equity', 100) - 100
-    pnl_pct = (pnl_value / 100) * 100 if pnl_value != 0 else 0
-    
-    return render_template_string(
-        HTML_TEMPLATE,
-        portfolio=positions,
-        trades=trades,
-        equity_history=equity_history,
-        metrics=metrics,
-        pnl_value=pnl_value,
-        pnl_pct=pnl_pct,
-        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    )
+    cached = _not_modified(INDEX_ETAG, 'max-age=300')
+    if cached:
+        return cached
+    return Response(INDEX_HTML, mimetype='text/html',
+                    headers={'ETag': INDEX_ETAG, 'Cache-Control': 'max-age=300'})
 
-@app.route('/api/data')
-def api_data():
+# Last encoded /api/data body per trade limit, with the data version (ETag)
+# it was built from, shared by all clients so each version is loaded and
+# encoded only once
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+MAX_SNAPSHOTS = 8
+
+def _build_payload(limit):
+    # Stat before reading: a write in between changes the version, so the
+    # next rebuild recomputes instead of keeping stale metrics
+    metrics_key = (_file_version(TRADES_FILE), _file_version(EQUITY_FILE))
     positions = load_positions()
     trades = load_trades()
     equity_history = load_equity_history()
-    metrics = calculate_metrics(trades, equity_history)
+    # Metrics always cover the full trade history
+    metrics = _cached_metrics(metrics_key, trades, equity_history)
     
-    return jsonify({
+    # Encoded directly: jsonify would also sort every key of every trade
+    return json.dumps({
         'portfolio': positions,
-        'trades': trades,
+        'trades': trades if limit is None else trades[max(len(trades) - limit, 0):],
+        'trades_total': len(trades),
         'equity_history': equity_history,
         'metrics': metrics
-    })
+    }, separators=(',', ':'))
+
+def _payload(etag, limit):
+    """Encoded /api/data body for this data version, rebuilt only when it changes"""
+    snapshot_etag, payload = _snapshots.get(limit, (None, None))
+    if snapshot_etag == etag:
+        return payload
+    with _snapshot_lock:
+        # Another request may have rebuilt it while this one waited
+        snapshot_etag, payload = _snapshots.get(limit, (None, None))
+        if snapshot_etag != etag:
+            payload = _build_payload(limit)
+            # The limit comes from the client: keep the table bounded
+            if limit in _snapshots or len(_snapshots) < MAX_SNAPSHOTS:
+                _snapshots[limit] = (etag, payload)
+    return payload
+
+@app.route('/api/data')
+def api_data():
+    # ?limit=N returns only the N most recent trades (all of them by default)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(limit, 0)
+    
+    # Unchanged files mean an unchanged payload: skip loading and encoding
+    etag = _data_etag()
+    if limit is not None:
+        etag = '%s-%d"' % (etag[:-1], limit)
+    cached = _not_modified(etag, 'no-cache')
+    if cached:
+        return cached
+    
+    response = Response(_payload(etag, limit), mimetype='application/json')
+    # Polled every 5s: the browser must always revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['ETag'] = etag
+    return response
 
 if __name__ == '__main__':
     print("🌐 Starting Polymarket Web Dashboard...")
     print("📱 Access at: http://localhost:5000")
     print("🔄 Auto-refresh every 5 seconds")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # For production: gunicorn -w 2 -k gthread --threads 8 -b 0.0.0.0:5000 web_dashboard:app
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)